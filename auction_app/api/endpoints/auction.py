@@ -1,46 +1,112 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
-from auction_app.db.models import Auction
-from auction_app.db.schema import AuctionSchema, AuctionCreateSchema
-from auction_app.db.database import SessionLocal
-from typing import List
+from fastapi import Depends, HTTPException, APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Auction, Car, Bid
+from auction_app.db.schema import AuctionSchema, AuctionCreateSchema, AuctionDetailSchema, BidDetailSchema, Page
+from auction_app.db.database import get_db, SessionLocal
+from auction_app.db.redis_client import get_redis
+from auction_app.services.live_cache import get_live_auction, cache_auction
+from auction_app.services.auction_events import hub, PING, publish_event
+from auction_app.db.pagination import keyset_page, schema_columns, page_content
+from auction_app.services.rate_limit import RateLimit
+from auction_app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, AUCTION_TOP_BIDS
+from typing import Optional
 
 auction_router = APIRouter(prefix='/auction', tags=['Auction'])
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @auction_router.post('/')
-async def auction_create(auction: AuctionCreateSchema, db: Session = Depends(get_db)):
+async def auction_create(auction: AuctionCreateSchema, db: AsyncSession = Depends(get_db)):
     auction_db = Auction(**auction.dict())
     db.add(auction_db)
-    db.commit()
-    db.refresh(auction_db)
+    await db.commit()
+    await db.refresh(auction_db)
+    await cache_auction(get_redis(), auction_db)
+    await publish_event(get_redis(), auction_db.id, {'type': 'scheduled', 'end_time': auction_db.end_time.isoformat()})
     return auction_db
 
 
-@auction_router.get('/', response_model=List[AuctionSchema])
-async def auction_list(db: Session = Depends(get_db)):
-    return db.query(Auction).all()
+@auction_router.get('/', response_model=Page[AuctionSchema],
+                    dependencies=[Depends(RateLimit('list'))])
+async def auction_list(limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                       db: AsyncSession = Depends(get_db)):
+    page = await keyset_page(db, select(*schema_columns(Auction, AuctionSchema)), [Auction.id], limit, cursor)
+    return ORJSONResponse(page_content(page))
 
 
 @auction_router.get('/{auction_id}/', response_model=AuctionSchema)
-async def auction_detail(auction_id: int,db: Session = Depends(get_db)):
-    auction = db.query(Auction).filter(Auction.id == auction_id).first()
+async def auction_detail(auction_id: int):
+    live = await get_live_auction(get_redis(), auction_id)
+    if live is not None:
+        return live
+
+    async with SessionLocal() as db:
+        auction = await db.get(Auction, auction_id)
 
     if auction is None:
         raise  HTTPException(status_code=400, detail='Мындай маалымат жок')
+    await cache_auction(get_redis(), auction)
     return auction
 
 
+@auction_router.get('/{auction_id}/full/', response_model=AuctionDetailSchema)
+async def auction_full(auction_id: int, db: AsyncSession = Depends(get_db)):
+    auction = await db.scalar(select(Auction).where(Auction.id == auction_id).options(
+        joinedload(Auction.car, innerjoin=True).joinedload(Car.seller, innerjoin=True)))
+    if auction is None:
+        raise HTTPException(status_code=404, detail='Мындай маалымат жок')
+
+    bids = await db.scalars(select(Bid).where(Bid.auction_id == auction_id)
+                            .options(joinedload(Bid.buyer, innerjoin=True))
+                            .order_by(Bid.amount.desc(), Bid.id).limit(AUCTION_TOP_BIDS))
+    detail = AuctionDetailSchema.model_validate(auction, from_attributes=True)
+    detail.top_bids = [BidDetailSchema.model_validate(bid, from_attributes=True) for bid in bids]
+    return detail
+
+
+@auction_router.websocket('/{auction_id}/stream')
+async def auction_stream(websocket: WebSocket, auction_id: int):
+    await websocket.accept()
+    subscription = hub.subscribe(auction_id)
+    try:
+        while True:
+            message = await subscription.receive()
+            if message is None:
+                await websocket.close(code=1013)
+                break
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@auction_router.get('/{auction_id}/stream')
+async def auction_stream_sse(auction_id: int, request: Request):
+    async def events():
+        subscription = hub.subscribe(auction_id)
+        try:
+            while True:
+                message = await subscription.receive()
+                if message is None:
+                    break
+                if message is PING:
+                    if await request.is_disconnected():
+                        break
+                    yield ': ping\n\n'
+                    continue
+                yield f'data: {message}\n\n'
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
 # @auction_router.put('/{auction_id}', response_model=AuctionCreateSchema)
-# async def auction_update(auction_id: int, auction: AuctionCreateSchema, db: Session = Depends(get_db)):
-#     auction_db = db.query(Auction).filter(Auction.id==auction_id).first()
+# async def auction_update(auction_id: int, auction: AuctionCreateSchema, db: AsyncSession = Depends(get_db)):
+#     auction_db = await db.get(Auction, auction_id)
 #
 #     if auction_db is None:
 #         raise HTTPException(status_code=404, detail='такого авто не существует')
@@ -48,19 +114,19 @@ async def auction_detail(auction_id: int,db: Session = Depends(get_db)):
 #         setattr(auction_db, auction_key, auction_value)
 #
 #     db.add(auction_db)
-#     db.commit()
-#     db.refresh(auction_db)
+#     await db.commit()
+#     await db.refresh(auction_db)
 #     return auction_db
 #
 #
 # @auction_router.delete('/{auction_db_id}')
-# async def auction_db_delete(auction_db_id: int, db: Session = Depends(get_db)):
-#     auction_db = db.query(Auction).filter(Auction.id==auction_db_id).first()
+# async def auction_db_delete(auction_db_id: int, db: AsyncSession = Depends(get_db)):
+#     auction_db = await db.get(Auction, auction_db_id)
 #     if auction_db is None:
 #         raise HTTPException(status_code=404, detail='такого авто не существует')
 #
-#     db.delete(auction_db)
-#     db.commit()
+#     await db.delete(auction_db)
+#     await db.commit()
 #     return {"message": 'Этот авто удалено'}
 #
 #
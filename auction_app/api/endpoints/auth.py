@@ -1,55 +1,80 @@
 from alembic.util import status
 from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from auction_app.db.models import(UserProfile, RefreshToken)
-from auction_app.db.schema import (UserProfileSchema, UserProfileCreateSchema)
-from auction_app.db.database import SessionLocal
+from auction_app.db.schema import (UserProfileSchema, UserProfileCreateSchema, CurrentUserSchema)
+from auction_app.db.database import get_db
+from auction_app.db.redis_client import get_redis
 from typing import Optional
 from auction_app.config import SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, ALGORITHM
-from jose import jwt
-from passlib.context import CryptContext
+from jose import jwt, JWTError
+from auction_app.services.passwords import hash_password, verify_password
+from auction_app.services.token_cache import token_cache, token_key, is_revoked, revoke
+from auction_app.services.refresh_tokens import hash_token
 from datetime import timedelta, datetime
+from uuid import uuid4
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi_limiter.depends import RateLimiter
+from auction_app.services.rate_limit import RateLimit
+from auction_app.services.response_cache import invalidate_responses
 
 
 auth_router = APIRouter(prefix='/auth', tags=['Auth'])
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl='/auth/login')
-password_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+optional_oauth2_schema = OAuth2PasswordBearer(tokenUrl='/auth/login', auto_error=False)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({'exp':expire})
+    to_encode.setdefault('type', 'access')
+    to_encode.update({'exp':expire, 'jti': uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def verify_password(plain_password, hash_password):
-    return password_context.verify(plain_password, hash_password)
+def create_refresh_token(data: dict):
+    return create_access_token({**data, 'type': 'refresh'}, expires_delta= timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
 
+def user_claims(user: UserProfile):
+    return {'sub': user.username, 'uid': user.id, 'status': user.status.value}
 
-def create_refresh_token(data: dict):
-    return create_access_token(data, expires_delta= timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+def decode_token(token: str, token_type: str):
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail='Токен туура эмес', headers={'WWW-Authenticate': 'Bearer'})
+    if claims.get('type') != token_type or 'jti' not in claims:
+        raise HTTPException(status_code=401, detail='Токен туура эмес', headers={'WWW-Authenticate': 'Bearer'})
+    return claims
+
+
+def issue_refresh_token(db: AsyncSession, user: UserProfile) -> str:
+    refresh_token = create_refresh_token(user_claims(user))
+    claims = jwt.get_unverified_claims(refresh_token)
+    db.add(RefreshToken(jti=claims['jti'], token_hash=hash_token(refresh_token), user_id=user.id,
+                        expires_at=datetime.utcfromtimestamp(claims['exp'])))
+    return refresh_token
 
 
-def get_password_hash(password):
-    return password_context.hash(password)
+async def get_current_user(token: str = Depends(oauth2_schema)) -> CurrentUserSchema:
+    key = token_key(token)
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = decode_token(token, 'access')
+        if 'uid' not in claims or await is_revoked(get_redis(), claims['jti']):
+            raise HTTPException(status_code=401, detail='Токен туура эмес', headers={'WWW-Authenticate': 'Bearer'})
+        token_cache.set(key, claims)
+    return CurrentUserSchema(id=claims['uid'], username=claims['sub'], status=claims['status'])
 
 
 @auth_router.post('/register/')
-async def register(user: UserProfileCreateSchema, db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.username == user.username).first()
+async def register(user: UserProfileCreateSchema, db: AsyncSession = Depends(get_db)):
+    user_db = await db.scalar(select(UserProfile).where(UserProfile.username == user.username))
     if user_db:
         raise HTTPException(status_code=400, detail='uesername бар экен')
-    new_hash_pass = get_password_hash(user.hash_password)
+    new_hash_pass = await hash_password(user.hash_password)
     new_user = UserProfile(
         username=user.username,
         phone_number=user.phone_number,
@@ -57,43 +82,75 @@ async def register(user: UserProfileCreateSchema, db: Session = Depends(get_db))
         status=user.status
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return {"message": 'Saved'}
 
 
-@auth_router.post('/login/', dependencies=[Depends(RateLimiter(times=2, seconds=10))])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(UserProfile).filter(UserProfile.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hash_password):
+@auth_router.post('/login/', dependencies=[Depends(RateLimit('login'))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(UserProfile).where(UserProfile.username == form_data.username))
+    if not user:
         raise HTTPException(status_code=401, detail='Маалымат туура эмес')
-    access_token = create_access_token({'sub': user.username})
-    refresh_token = create_refresh_token({'sub': user.username})
-    token_db = RefreshToken(token=refresh_token, user_id=user.id)
-    db.add(token_db)
-    db.commit()
+    valid, new_hash = await verify_password(form_data.password, user.hash_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail='Маалымат туура эмес')
+    if new_hash:
+        user.hash_password = new_hash
+    access_token = create_access_token(user_claims(user))
+    refresh_token = issue_refresh_token(db, user)
+    await db.commit()
+    if new_hash:
+        await invalidate_responses('user')
 
     return {'access_token': access_token, 'refresh_token': refresh_token, 'token_type': 'bearer'}
 
 
 @auth_router.post('/logout/')
-async def logout(refresh_token: str, db: Session = Depends(get_db)):
-    stored_token = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
+async def logout(refresh_token: str, access_token: Optional[str] = Depends(optional_oauth2_schema),
+                 db: AsyncSession = Depends(get_db)):
+    claims = decode_token(refresh_token, 'refresh')
+    # Only the current, not yet rotated token of a login may end it.
+    stored_token = await db.scalar(select(RefreshToken).where(RefreshToken.jti == claims['jti'],
+                                                              RefreshToken.token_hash == hash_token(refresh_token),
+                                                              RefreshToken.rotated_at.is_(None)))
 
     if not stored_token:
         raise HTTPException(status_code=401, detail='маалымат туура эмес')
-    db.delete(stored_token)
-    db.commit()
+    if access_token:
+        token_cache.discard(token_key(access_token))
+        try:
+            await revoke(get_redis(), decode_token(access_token, 'access'))
+        except HTTPException:
+            pass
+    await db.delete(stored_token)
+    await db.commit()
     return {'message': "Вышли"}
 
 
 @auth_router.post('/refresh/')
-async def refresh(refresh_token: str, db: Session = Depends(get_db)):
-    token_entry = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
+async def refresh(refresh_token: str, db: AsyncSession = Depends(get_db)):
+    claims = decode_token(refresh_token, 'refresh')
+    rotated = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == claims['jti'], RefreshToken.token_hash == hash_token(refresh_token),
+               RefreshToken.rotated_at.is_(None))
+        .values(rotated_at=datetime.utcnow())
+    )
+    if rotated.rowcount != 1:
+        reused = await db.scalar(select(RefreshToken.id).where(RefreshToken.jti == claims['jti']))
+        if reused is not None:
+            # An already rotated token came back: treat the whole login as stolen.
+            await db.execute(delete(RefreshToken).where(RefreshToken.user_id == claims['uid']))
+            await db.commit()
+        raise HTTPException(status_code=401, detail='маалымат туура эмес')
 
-    if not token_entry:
+    user = await db.get(UserProfile, claims['uid'])
+    if user is None:
         raise HTTPException(status_code=401, detail='маалымат туура эмес')
-    access_token = create_access_token({"sub": token_entry.user_id})
+    access_token = create_access_token(user_claims(user))
+    new_refresh_token = issue_refresh_token(db, user)
+    await db.commit()
 
-    return {'access_token': access_token, "token_type": "bearer"}
+    return {'access_token': access_token, 'refresh_token': new_refresh_token, "token_type": "bearer"}
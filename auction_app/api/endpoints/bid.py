@@ -1,29 +1,76 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
+import uuid
+from fastapi import Depends, HTTPException, APIRouter, Query, Body, Header
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from auction_app.db.models import Bid
-from auction_app.db.schema import BidCreateSchema,BidSchema
-from auction_app.db.database import SessionLocal
-from typing import List
+from auction_app.db.schema import (BidCreateSchema,BidSchema, BidAcceptedSchema, BulkResultSchema, ProxyBidCreateSchema, ProxyBidResultSchema,
+                                   Page, CurrentUserSchema)
+from auction_app.db.database import get_db, SessionLocal
+from auction_app.db.pagination import keyset_page, schema_columns, page_content
+from auction_app.services.rate_limit import RateLimit
+from auction_app.services.bid_engine import place_bid, accept_bid, set_proxy_bid, BidError
+from auction_app.services.bulk import validate_items, insert_bids
+from auction_app.api.endpoints.auth import get_current_user
+from auction_app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, BULK_MAX_ITEMS, BID_WRITE_BEHIND
+from typing import Optional, List
 
 bid_router = APIRouter(prefix='/bid', tags=['Bid'])
 
-async def get_db():
-    db = SessionLocal()
+
+@bid_router.post('/', response_model=BidSchema, responses={202: {'model': BidAcceptedSchema}},
+                 dependencies=[Depends(RateLimit('bid'))])
+async def bid_create(bid: BidCreateSchema, idempotency_key: Optional[str] = Header(None, max_length=64),
+                     current_user: CurrentUserSchema = Depends(get_current_user)):
+    if bid.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail='Башка колдонуучунун атынан ставка коюуга болбойт')
     try:
-        yield db
-    finally:
-        db.close()
+        if BID_WRITE_BEHIND:
+            accepted = await accept_bid(bid.auction_id, bid.buyer_id, bid.amount, idempotency_key or uuid.uuid4().hex)
+            return ORJSONResponse(BidAcceptedSchema.model_validate(accepted).model_dump(mode='json'),
+                                  status_code=202)
+        async with SessionLocal() as db:
+            return await place_bid(db, bid.auction_id, bid.buyer_id, bid.amount)
+    except BidError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail)
+
+
+@bid_router.post('/proxy/', response_model=ProxyBidResultSchema, dependencies=[Depends(RateLimit('bid'))])
+async def proxy_bid_set(proxy: ProxyBidCreateSchema, current_user: CurrentUserSchema = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    if proxy.buyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail='Башка колдонуучунун атынан ставка коюуга болбойт')
+    try:
+        proxy_db, bids = await set_proxy_bid(db, proxy.auction_id, proxy.buyer_id, proxy.max_amount)
+    except BidError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail)
+    return {'proxy': proxy_db, 'bids': bids}
+
 
+@bid_router.post('/bulk/', response_model=BulkResultSchema, dependencies=[Depends(RateLimit('bulk'))])
+async def bid_bulk_create(items: List[dict] = Body(..., max_length=BULK_MAX_ITEMS),
+                          current_user: CurrentUserSchema = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_db)):
+    valid, errors = validate_items(BidCreateSchema, items)
+    own = []
+    for index, bid in valid:
+        if bid.buyer_id != current_user.id:
+            errors.append({'index': index, 'detail': 'Башка колдонуучунун атынан ставка коюуга болбойт'})
+        else:
+            own.append((index, bid))
+    created, failed = await insert_bids(db, own)
+    return {'created': sorted(created, key=lambda item: item['index']),
+            'errors': sorted(errors + failed, key=lambda item: item['index'])}
 
-@bid_router.post('/')
-async def bid_create(bid: BidCreateSchema, db: Session = Depends(get_db)):
-    bid_db = Bid(**bid.dict())
-    db.add(bid_db)
-    db.commit()
-    db.refresh(bid_db)
-    return bid_db
 
+@bid_router.get('/', response_model=Page[BidSchema],
+                dependencies=[Depends(RateLimit('list'))])
+async def bid_get(auction_id: Optional[int] = None,
+                  limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                  db: AsyncSession = Depends(get_db)):
+    query = select(*schema_columns(Bid, BidSchema))
+    if auction_id is not None:
+        query = query.where(Bid.auction_id == auction_id)
+    page = await keyset_page(db, query, [Bid.created_date, Bid.id], limit, cursor, descending=True)
+    return ORJSONResponse(page_content(page))
 
-@bid_router.get('/', response_model=List[BidSchema])
-async def bid_get(db: Session = Depends(get_db)):
-    return db.query(Bid).all
\ No newline at end of file
@@ -1,66 +1,198 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
-from auction_app.db.models import Car
-from auction_app.db.schema import CarSchema, CarCreateSchema
-from auction_app.db.database import SessionLocal
-from typing import List
+from fastapi import (Depends, HTTPException, APIRouter, Query, Request, Body, BackgroundTasks, UploadFile,
+                     File)
+from fastapi.responses import ORJSONResponse
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Car, StatusFuelChoices, StatusTransmissionsChoices
+from auction_app.db.schema import CarSchema, CarCreateSchema, CarImageSchema, BulkResultSchema, Page, CurrentUserSchema
+from auction_app.db.database import get_db, SessionLocal
+from auction_app.db.pagination import keyset_page, schema_columns, page_json, page_content
+from auction_app.api.endpoints.auth import get_current_user
+from auction_app.services.rate_limit import RateLimit
+from auction_app.services.car_search import SORT_COLUMNS, text_filter
+from auction_app.services.storage import storage
+from auction_app.services.thumbnails import image_extension, generate_thumbnails, thumbnail_urls
+from auction_app.services.bulk import validate_items, insert_cars
+from auction_app.services.car_facets import car_facets, adjust_facets, get_facets
+from auction_app.services.response_cache import cached_response, invalidate_responses, adapter_json
+from auction_app.config import (PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, BULK_MAX_ITEMS, MEDIA_MAX_UPLOAD_BYTES,
+                                MEDIA_CHUNK_SIZE)
+from typing import Optional, List
+from datetime import datetime
 
 car_router = APIRouter(prefix='/car', tags=['Car'])
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+car_json = adapter_json(TypeAdapter(CarSchema))
 
 
 @car_router.post('/')
-async def car_create(car: CarCreateSchema, db: Session = Depends(get_db)):
+async def car_create(car: CarCreateSchema, db: AsyncSession = Depends(get_db)):
     car_db = Car(**car.dict())
     db.add(car_db)
-    db.commit()
-    db.refresh(car_db)
+    await adjust_facets(db, added=car_facets(car_db))
+    await db.commit()
+    await db.refresh(car_db)
+    await invalidate_responses('car')
     return car_db
 
 
-@car_router.get('/', response_model=List[CarSchema])
-async def car_list(db: Session = Depends(get_db)):
-    return db.query(Car).all()
+@car_router.post('/bulk/', response_model=BulkResultSchema, dependencies=[Depends(RateLimit('bulk'))])
+async def car_bulk_create(items: List[dict] = Body(..., max_length=BULK_MAX_ITEMS), db: AsyncSession = Depends(get_db)):
+    valid, errors = validate_items(CarCreateSchema, items)
+    created, failed = await insert_cars(db, valid) if valid else ([], [])
+    if created:
+        await invalidate_responses('car')
+    return {'created': sorted(created, key=lambda item: item['index']),
+            'errors': sorted(errors + failed, key=lambda item: item['index'])}
+
+
+@car_router.get('/', response_model=Page[CarSchema],
+                dependencies=[Depends(RateLimit('list'))])
+async def car_list(request: Request, limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                   cursor: Optional[str] = None):
+    async def load():
+        async with SessionLocal() as db:
+            return await keyset_page(db, select(*schema_columns(Car, CarSchema)), [Car.id], limit, cursor)
+
+    return await cached_response(request, 'car', page_json, load)
+
+
+@car_router.get('/search/', response_model=Page[CarSchema],
+                dependencies=[Depends(RateLimit('list'))])
+async def car_search(q: Optional[str] = Query(None, max_length=100),
+                     fuel_status: Optional[StatusFuelChoices] = None,
+                     transmission_status: Optional[StatusTransmissionsChoices] = None,
+                     min_price: Optional[int] = None, max_price: Optional[int] = None,
+                     min_mileage: Optional[int] = None, max_mileage: Optional[int] = None,
+                     min_year: Optional[int] = Query(None, ge=1900, le=2100),
+                     max_year: Optional[int] = Query(None, ge=1900, le=2100),
+                     sort: str = Query('id', pattern='^-?(id|price|mileage|year)$'),
+                     limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                     db: AsyncSession = Depends(get_db)):
+    query = select(*schema_columns(Car, CarSchema))
+    if q and q.strip():
+        query = query.where(text_filter(db.bind.dialect.name, q))
+    if fuel_status is not None:
+        query = query.where(Car.fuel_status == fuel_status)
+    if transmission_status is not None:
+        query = query.where(Car.transmission_status == transmission_status)
+    if min_price is not None:
+        query = query.where(Car.price >= min_price)
+    if max_price is not None:
+        query = query.where(Car.price <= max_price)
+    if min_mileage is not None:
+        query = query.where(Car.mileage >= min_mileage)
+    if max_mileage is not None:
+        query = query.where(Car.mileage <= max_mileage)
+    if min_year is not None:
+        query = query.where(Car.year >= datetime(min_year, 1, 1))
+    if max_year is not None:
+        query = query.where(Car.year < datetime(max_year + 1, 1, 1))
+
+    sort_key = sort.lstrip('-')
+    columns = [Car.id] if sort_key == 'id' else [SORT_COLUMNS[sort_key], Car.id]
+    page = await keyset_page(db, query, columns, limit, cursor, descending=sort.startswith('-'))
+    return ORJSONResponse(page_content(page))
+
+
+@car_router.get('/facets/')
+async def car_facet_counts(request: Request):
+    async def load():
+        async with SessionLocal() as db:
+            return await get_facets(db)
+
+    return await cached_response(request, 'car', orjson.dumps, load)
 
 
 @car_router.get('/{car_id}/', response_model=CarSchema)
-async def car_detail(car_id: int,db: Session = Depends(get_db)):
-    car = db.query(Car).filter(Car.id == car_id).first()
+async def car_detail(car_id: int, request: Request):
+    async def load():
+        async with SessionLocal() as db:
+            car = await db.get(Car, car_id)
+
+        if car is None:
+            raise  HTTPException(status_code=400, detail='Мындай маалымат жок')
+        return car
 
-    if car is None:
-        raise  HTTPException(status_code=400, detail='Мындай маалымат жок')
-    return car
+    return await cached_response(request, 'car', car_json, load)
 
 
-@car_router.put('/{car_id}', response_model=CarCreateSchema)
-async def car_update(car_id: int, car: CarCreateSchema, db: Session = Depends(get_db)):
-    car_db = db.query(Car).filter(Car.id==car_id).first()
+@car_router.put('/{car_id}', response_model=CarSchema)
+async def car_update(car_id: int, car: CarCreateSchema, db: AsyncSession = Depends(get_db)):
+    car_db = await db.get(Car, car_id, with_for_update=True)
 
     if car_db is None:
         raise HTTPException(status_code=404, detail='такого авто не существует')
+    old_facets = car_facets(car_db)
     for car_key, car_value in car.dict().items():
         setattr(car_db, car_key, car_value)
 
     db.add(car_db)
-    db.commit()
-    db.refresh(car_db)
+    await adjust_facets(db, old_facets, car_facets(car_db))
+    await db.commit()
+    await db.refresh(car_db)
+    await invalidate_responses('car')
+    return car_db
+
+
+async def owned_car(db: AsyncSession, car_id: int, user_id: int, **options) -> Car:
+    car_db = await db.get(Car, car_id, **options)
+    if car_db is None:
+        raise HTTPException(status_code=404, detail='такого авто не существует')
+    if car_db.seller_id != user_id:
+        raise HTTPException(status_code=403, detail='Башка колдонуучунун унаасына сүрөт жүктөөгө болбойт')
     return car_db
 
 
+@car_router.post('/{car_id}/image/', response_model=CarImageSchema)
+async def car_image_upload(car_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                           current_user: CurrentUserSchema = Depends(get_current_user)):
+    # Checked before anything touches the disk, so only the car's seller can store files.
+    async with SessionLocal() as db:
+        await owned_car(db, car_id, current_user.id)
+
+    head = await file.read(MEDIA_CHUNK_SIZE)
+    extension = image_extension(head)
+    if extension is None:
+        raise HTTPException(status_code=415, detail='JPEG, PNG, GIF же WEBP сүрөт гана жүктөөгө болот')
+
+    async def chunks():
+        size, chunk = 0, head
+        while chunk:
+            size += len(chunk)
+            if size > MEDIA_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail='Файл өтө чоң')
+            yield chunk
+            chunk = await file.read(MEDIA_CHUNK_SIZE)
+
+    key, created = await storage.save(chunks(), extension)
+    try:
+        async with SessionLocal() as db:
+            car_db = await owned_car(db, car_id, current_user.id, with_for_update=True)
+            car_db.image = storage.url(key)
+            await db.commit()
+    except BaseException:
+        # A file that already existed belongs to an earlier upload of the same image.
+        if created:
+            await storage.delete(key)
+        raise
+    await invalidate_responses('car')
+    background_tasks.add_task(generate_thumbnails, key)
+    return {'image': storage.url(key), 'thumbnails': thumbnail_urls(key)}
+
+
 @car_router.delete('/{car_db_id}')
-async def car_db_delete(car_db_id: int, db: Session = Depends(get_db)):
-    car_db = db.query(Car).filter(Car.id==car_db_id).first()
+async def car_db_delete(car_db_id: int, db: AsyncSession = Depends(get_db)):
+    car_db = await db.get(Car, car_db_id, with_for_update=True)
     if car_db is None:
         raise HTTPException(status_code=404, detail='такого авто не существует')
 
-    db.delete(car_db)
-    db.commit()
+    await db.delete(car_db)
+    await adjust_facets(db, removed=car_facets(car_db))
+    await db.commit()
+    await invalidate_responses('car')
     return {"message": 'Этот авто удалено'}
 
 
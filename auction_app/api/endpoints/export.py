@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from auction_app.db.models import Auction, Bid, StatusAuctionChoices
+from auction_app.db.database import SessionLocal
+from auction_app.services.rate_limit import RateLimit
+from auction_app.config import EXPORT_CHUNK_SIZE
+
+export_router = APIRouter(prefix='/export', tags=['Export'], dependencies=[Depends(RateLimit('export'))])
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_chunk(rows, fmt: str):
+    if fmt == 'ndjson':
+        return ''.join(json.dumps({key: plain(value) for key, value in row._mapping.items()}) + '\n'
+                       for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_rows(query, fmt: str):
+    # The request's get_db session is closed before the body is sent, so the export owns its session.
+    async with SessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        if fmt == 'csv':
+            yield encode_chunk([result.keys()], 'csv')
+        async for rows in result.partitions():
+            yield encode_chunk(rows, fmt)
+
+
+def export_response(query, fmt: str, name: str):
+    return StreamingResponse(stream_rows(query, fmt), media_type=MEDIA_TYPES[fmt],
+                             headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'})
+
+
+@export_router.get('/bid/')
+async def bid_export(fmt: Literal['ndjson', 'csv'] = 'ndjson', auction_id: Optional[int] = None,
+                     date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    query = select(Bid.id, Bid.auction_id, Bid.buyer_id, Bid.amount, Bid.created_date)
+    if auction_id is not None:
+        query = query.where(Bid.auction_id == auction_id)
+    if date_from is not None:
+        query = query.where(Bid.created_date >= date_from)
+    if date_to is not None:
+        query = query.where(Bid.created_date < date_to)
+    return export_response(query.order_by(Bid.id), fmt, 'bids')
+
+
+@export_router.get('/auction/')
+async def auction_export(fmt: Literal['ndjson', 'csv'] = 'ndjson', auction_status: Optional[StatusAuctionChoices] = None,
+                         date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    query = select(Auction.id, Auction.car_id, Auction.auction_status, Auction.start_price, Auction.min_price,
+                   Auction.start_time, Auction.end_time)
+    if auction_status is not None:
+        query = query.where(Auction.auction_status == auction_status)
+    if date_from is not None:
+        query = query.where(Auction.end_time >= date_from)
+    if date_to is not None:
+        query = query.where(Auction.end_time < date_to)
+    return export_response(query.order_by(Auction.id), fmt, 'auctions')
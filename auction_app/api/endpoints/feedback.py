@@ -1,37 +1,45 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from auction_app.db.models import Feedback
-from auction_app.db.schema import FeedbackSchema, FeedbackCreateSchema
-from auction_app.db.database import SessionLocal
-from typing import List
+from auction_app.db.schema import FeedbackSchema, FeedbackCreateSchema, Page
+from auction_app.db.database import get_db, SessionLocal
+from auction_app.db.pagination import keyset_page, schema_columns, page_json
+from auction_app.services.rate_limit import RateLimit
+from auction_app.services.reputation import feedback_entry, adjust_reputation
+from auction_app.services.response_cache import cached_response, invalidate_responses
+from auction_app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from typing import Optional
 
 feedback_router = APIRouter(prefix='/feedback', tags=['Feedback'])
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 @feedback_router.post('/')
-async def feedback_create(feedback: FeedbackCreateSchema, db: Session = Depends(get_db)):
+async def feedback_create(feedback: FeedbackCreateSchema, db: AsyncSession = Depends(get_db)):
     feedback_db = Feedback(**feedback.dict())
     db.add(feedback_db)
-    db.commit()
-    db.refresh(feedback_db)
+    await adjust_reputation(db, added=[feedback_entry(feedback_db)])
+    await db.commit()
+    await db.refresh(feedback_db)
+    await invalidate_responses('feedback')
     return feedback_db
 
 
-@feedback_router.get('/', response_model=List[FeedbackSchema])
-async def feedback_list(db: Session = Depends(get_db)):
-    return db.query(Feedback).all()
+@feedback_router.get('/', response_model=Page[FeedbackSchema],
+                     dependencies=[Depends(RateLimit('list'))])
+async def feedback_list(request: Request, limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                        cursor: Optional[str] = None):
+    async def load():
+        async with SessionLocal() as db:
+            return await keyset_page(db, select(*schema_columns(Feedback, FeedbackSchema)),
+                                     [Feedback.created_date, Feedback.id], limit, cursor, descending=True)
+
+    return await cached_response(request, 'feedback', page_json, load)
 
 
 @feedback_router.get('/{feedback_id}/', response_model=FeedbackSchema)
-async def feedback_detail(feedback_id: int,db: Session = Depends(get_db)):
-    feedback = db.query(Feedback).filter(Feedback.id == feedback_id).first()
+async def feedback_detail(feedback_id: int,db: AsyncSession = Depends(get_db)):
+    feedback = await db.get(Feedback, feedback_id)
 
     if feedback is None:
         raise  HTTPException(status_code=400, detail='Мындай маалымат жок')
@@ -39,28 +47,33 @@ async def feedback_detail(feedback_id: int,db: Session = Depends(get_db)):
 
 
 @feedback_router.put('/{feedback_id}', response_model=FeedbackCreateSchema)
-async def feedback_update(feedback_id: int, feedback: FeedbackCreateSchema, db: Session = Depends(get_db)):
-    feedback_db = db.query(Feedback).filter(Feedback.id==feedback_id).first()
+async def feedback_update(feedback_id: int, feedback: FeedbackCreateSchema, db: AsyncSession = Depends(get_db)):
+    feedback_db = await db.get(Feedback, feedback_id, with_for_update=True)
 
     if feedback_db is None:
         raise HTTPException(status_code=404, detail='такого авто не существует')
+    old_entry = feedback_entry(feedback_db)
     for feedback_key, feedback_value in feedback.dict().items():
         setattr(feedback_db, feedback_key, feedback_value)
 
     db.add(feedback_db)
-    db.commit()
-    db.refresh(feedback_db)
+    await adjust_reputation(db, [old_entry], [feedback_entry(feedback_db)])
+    await db.commit()
+    await db.refresh(feedback_db)
+    await invalidate_responses('feedback')
     return feedback_db
 
 
 @feedback_router.delete('/{feedback_db_id}')
-async def feedback_db_delete(feedback_db_id: int, db: Session = Depends(get_db)):
-    feedback_db = db.query(Feedback).filter(Feedback.id==feedback_db_id).first()
+async def feedback_db_delete(feedback_db_id: int, db: AsyncSession = Depends(get_db)):
+    feedback_db = await db.get(Feedback, feedback_db_id, with_for_update=True)
     if feedback_db is None:
         raise HTTPException(status_code=404, detail='такого авто не существует')
 
-    db.delete(feedback_db)
-    db.commit()
+    await db.delete(feedback_db)
+    await adjust_reputation(db, removed=[feedback_entry(feedback_db)])
+    await db.commit()
+    await invalidate_responses('feedback')
     return {"message": 'Этот авто удалено'}
 
 
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from auction_app.db.database import engine
+from auction_app.db.metrics import pool_metrics
+
+metrics_router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+
+@metrics_router.get('/pool/')
+async def pool_stats():
+    return pool_metrics.snapshot(engine.pool)
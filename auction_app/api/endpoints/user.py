@@ -1,36 +1,62 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
-from auction_app.db.models import UserProfile
-from auction_app.db.schema import UserProfileSchema, UserProfileCreateSchema
-from auction_app.db.database import SessionLocal
-from typing import List
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
+from fastapi.responses import ORJSONResponse
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from auction_app.db.models import UserProfile, Car, Auction, Feedback, SellerReputation
+from auction_app.db.schema import UserProfileSchema, UserProfileCreateSchema, SellerReputationSchema, Page
+from auction_app.db.database import get_db, SessionLocal
+from auction_app.db.pagination import keyset_page, schema_columns, page_content
+from auction_app.services.rate_limit import RateLimit
+from auction_app.services.car_facets import car_facets, adjust_facets
+from auction_app.services.reputation import feedback_entry, adjust_reputation, reputation_data
+from auction_app.services.response_cache import cached_response, invalidate_responses, adapter_json
+from auction_app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from typing import Optional
 
 user_router = APIRouter(prefix='/user', tags=['User'])
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+user_json = adapter_json(TypeAdapter(UserProfileSchema))
 
 
-@user_router.get('/', response_model=List[UserProfileSchema])
-async def user_list(db: Session = Depends(get_db)):
-    return db.query(UserProfile).all()
+@user_router.get('/', response_model=Page[UserProfileSchema],
+                 dependencies=[Depends(RateLimit('list'))])
+async def user_list(limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT), cursor: Optional[str] = None,
+                    db: AsyncSession = Depends(get_db)):
+    page = await keyset_page(db, select(*schema_columns(UserProfile, UserProfileSchema)), [UserProfile.id], limit,
+                             cursor)
+    return ORJSONResponse(page_content(page))
 
 
 @user_router.get('/{user_id}/', response_model=UserProfileSchema)
-async def user_detail(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserProfile).filter(UserProfile.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail='Пользователь не найден')
-    return user
+async def user_detail(user_id: int, request: Request):
+    async def load():
+        async with SessionLocal() as db:
+            user = await db.get(UserProfile, user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail='Пользователь не найден')
+        return user
+
+    return await cached_response(request, 'user', user_json, load)
+
+
+@user_router.get('/{user_id}/reputation/', response_model=SellerReputationSchema)
+async def user_reputation(user_id: int, request: Request):
+    async def load():
+        async with SessionLocal() as db:
+            reputation = await db.get(SellerReputation, user_id)
+            if reputation is None and await db.get(UserProfile, user_id) is None:
+                raise HTTPException(status_code=404, detail='Пользователь не найден')
+        return reputation_data(user_id, reputation)
+
+    return await cached_response(request, 'feedback', orjson.dumps, load)
 
 
 @user_router.put('/{user_id}/', response_model=UserProfileCreateSchema)
-async def user_update(user_id: int, user: UserProfileCreateSchema, db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def user_update(user_id: int, user: UserProfileCreateSchema, db: AsyncSession = Depends(get_db)):
+    user_db = await db.get(UserProfile, user_id)
     if user_db is None:
         raise HTTPException(status_code=404, detail='Пользователь не найден')
 
@@ -38,17 +64,30 @@ async def user_update(user_id: int, user: UserProfileCreateSchema, db: Session =
         setattr(user_db, key, value)
 
     db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
+    await invalidate_responses('user')
     return user_db
 
 
 @user_router.delete('/{user_id}/')
-async def user_delete(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def user_delete(user_id: int, db: AsyncSession = Depends(get_db)):
+    # The whole cascade is loaded up front; otherwise the delete lazy-loads it car by car.
+    user = await db.scalar(select(UserProfile).where(UserProfile.id == user_id).options(
+        selectinload(UserProfile.car_seller).selectinload(Car.auction_car).options(
+            selectinload(Auction.auction_bid), selectinload(Auction.proxy_bids)),
+        selectinload(UserProfile.tokens), selectinload(UserProfile.bid_buyer), selectinload(UserProfile.proxy_bids),
+        selectinload(UserProfile.feedback_seller), selectinload(UserProfile.feedback_buyer),
+        selectinload(UserProfile.reputation)))
     if user is None:
         raise HTTPException(status_code=404, detail='Пользователь не найден')
 
-    db.delete(user)
-    db.commit()
+    cars = await db.scalars(select(Car).where(Car.seller_id == user_id).with_for_update())
+    await adjust_facets(db, removed=[facet for car in cars for facet in car_facets(car)])
+    written = await db.scalars(select(Feedback).where(Feedback.buyer_id == user_id, Feedback.seller_id != user_id)
+                               .with_for_update())
+    await adjust_reputation(db, removed=[feedback_entry(feedback) for feedback in written])
+    await db.delete(user)
+    await db.commit()
+    await invalidate_responses('user', 'car', 'feedback')
     return {"message": "Пользователь удалён"}
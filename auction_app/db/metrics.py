@@ -0,0 +1,47 @@
+from bisect import bisect_left
+from auction_app.config import DB_POOL_WAIT_BUCKETS
+
+
+class PoolMetrics:
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self):
+        self.wait_counts = [0] * (len(self.buckets) + 1)
+        self.wait_sum = 0.0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def observe_wait(self, seconds: float):
+        self.wait_counts[bisect_left(self.buckets, seconds)] += 1
+        self.wait_sum += seconds
+        self.checkouts += 1
+
+    def snapshot(self, pool):
+        histogram = {}
+        total = 0
+        for bucket, count in zip(self.buckets, self.wait_counts):
+            total += count
+            histogram[str(bucket)] = total
+        histogram['+Inf'] = total + self.wait_counts[-1]
+        data = {
+            'checkouts': self.checkouts,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+            'checkout_wait_seconds_sum': round(self.wait_sum, 6),
+            'checkout_wait_seconds_bucket': histogram,
+        }
+        if hasattr(pool, 'checkedout'):
+            data.update(
+                pool_size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+            )
+        return data
+
+
+pool_metrics = PoolMetrics(DB_POOL_WAIT_BUCKETS)
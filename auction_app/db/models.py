@@ -1,4 +1,5 @@
-from sqlalchemy import Integer, String, Enum, ForeignKey, Text, DECIMAL, DateTime, Boolean
+from sqlalchemy import (Integer, String, Enum, ForeignKey, Text, DECIMAL, DateTime, Boolean, Index, UniqueConstraint, DDL,
+                        event)
 from auction_app.db.database import Base
 from typing import Optional, List
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -43,11 +44,15 @@ class UserProfile(Base):
                                                         cascade='all, delete-orphan')
     bid_buyer: Mapped[List['Bid']] = relationship('Bid', back_populates='buyer',
                                                   cascade='all, delete-orphan')
+    proxy_bids: Mapped[List['ProxyBid']] = relationship('ProxyBid', back_populates='buyer',
+                                                        cascade='all, delete-orphan')
 
     feedback_seller:Mapped[List['Feedback']] = relationship('Feedback', back_populates='seller',
                                                   cascade='all, delete-orphan', foreign_keys='Feedback.seller_id')
     feedback_buyer:Mapped[List['Feedback']] = relationship('Feedback', back_populates='buyer',
                                                   cascade='all, delete-orphan', foreign_keys='Feedback.buyer_id')
+    reputation: Mapped[Optional['SellerReputation']] = relationship('SellerReputation', back_populates='seller',
+                                                                    cascade='all, delete-orphan', uselist=False)
 
     def set_passwords(self, password: str):
         self.hash_password = bcrypt.hash(password)
@@ -60,9 +65,12 @@ class RefreshToken(Base):
 
     __tablename__ = 'refresh'
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    token: Mapped[str] = mapped_column(String, unique=True, index=True)
+    jti: Mapped[str] = mapped_column(String(32), unique=True, index=True, nullable=False)
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False)
     created_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    rotated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     user: Mapped['UserProfile'] = relationship('UserProfile', back_populates='tokens')
 
 
@@ -78,13 +86,53 @@ class Car(Base):
     mileage: Mapped[int] = mapped_column(Integer, nullable=False)
     price: Mapped[int] = mapped_column(Integer, nullable=False)
     description: Mapped[str] = mapped_column(Text)
-    image: Mapped[str] = mapped_column(String, nullable=False)
-    seller_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    image: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    seller_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     seller: Mapped['UserProfile'] = relationship('UserProfile', back_populates='car_seller')
     auction_car: Mapped['Auction'] = relationship('Auction', back_populates='car',
                                                   cascade='all, delete-orphan', uselist=False)
 
 
+Index('ix_car_price_id', Car.price, Car.id)
+Index('ix_car_mileage_id', Car.mileage, Car.id)
+Index('ix_car_year_id', Car.year, Car.id)
+Index('ix_car_fuel_status_transmission_status_price', Car.fuel_status, Car.transmission_status, Car.price, Car.id)
+
+CAR_SEARCH_VECTOR = ("to_tsvector('simple', coalesce(brand, '') || ' ' || coalesce(model, '') || ' ' "
+                     "|| coalesce(description, ''))")
+
+event.listen(Car.__table__, 'after_create', DDL(
+    f'CREATE INDEX ix_car_search ON car USING gin ({CAR_SEARCH_VECTOR})').execute_if(dialect='postgresql'))
+
+CAR_FTS_DDL = [
+    "CREATE VIRTUAL TABLE car_fts USING fts5(brand, model, description, content='car', content_rowid='id')",
+    "CREATE TRIGGER car_fts_insert AFTER INSERT ON car BEGIN "
+    "INSERT INTO car_fts(rowid, brand, model, description) VALUES (new.id, new.brand, new.model, new.description); "
+    "END",
+    "CREATE TRIGGER car_fts_delete AFTER DELETE ON car BEGIN "
+    "INSERT INTO car_fts(car_fts, rowid, brand, model, description) "
+    "VALUES ('delete', old.id, old.brand, old.model, old.description); "
+    "END",
+    "CREATE TRIGGER car_fts_update AFTER UPDATE ON car BEGIN "
+    "INSERT INTO car_fts(car_fts, rowid, brand, model, description) "
+    "VALUES ('delete', old.id, old.brand, old.model, old.description); "
+    "INSERT INTO car_fts(rowid, brand, model, description) VALUES (new.id, new.brand, new.model, new.description); "
+    "END",
+]
+
+for statement in CAR_FTS_DDL:
+    event.listen(Car.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Car.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS car_fts').execute_if(dialect='sqlite'))
+
+
+class CarFacet(Base):
+
+    __tablename__ = 'car_facet'
+    facet: Mapped[str] = mapped_column(String(32), primary_key=True)
+    value: Mapped[str] = mapped_column(String(64), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+
 class Auction(Base):
 
     __tablename__ = 'auction'
@@ -94,32 +142,97 @@ class Auction(Base):
     start_time: Mapped[datetime] = mapped_column(DateTime, default=datetime)
     end_time: Mapped[datetime] = mapped_column(DateTime, default=datetime)
     auction_status: Mapped[StatusAuctionChoices] = mapped_column(Enum(StatusAuctionChoices), nullable=False, default=StatusAuctionChoices.active)
+    current_price: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    current_bid_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    current_buyer_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    bid_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    winner_bid_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     car_id: Mapped[int] = mapped_column(ForeignKey('car.id'), unique=True)
     car: Mapped['Car'] = relationship('Car', back_populates='auction_car')
     auction_bid: Mapped[List['Bid']] = relationship('Bid', back_populates='auction',
                                               cascade='all, delete-orphan')
+    proxy_bids: Mapped[List['ProxyBid']] = relationship('ProxyBid', back_populates='auction',
+                                                        cascade='all, delete-orphan')
+
+    __table_args__ = (
+        Index('ix_auction_status_end_time', 'auction_status', 'end_time'),
+    )
 
 class Bid(Base):
 
+    # On Postgres bid is range-partitioned by created_date and its primary key there is (id, created_date).
     __tablename__ = 'bid'
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     amount: Mapped[int] = mapped_column(Integer, nullable=False)
     created_date: Mapped[datetime] = mapped_column(DateTime, default=datetime)
     auction_id: Mapped[int] = mapped_column(ForeignKey('auction.id'))
     auction: Mapped['Auction'] = relationship('Auction', back_populates='auction_bid')
-    buyer_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    buyer_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     buyer: Mapped['UserProfile'] = relationship('UserProfile', back_populates='bid_buyer')
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+
+class BidArchive(Base):
+
+    __tablename__ = 'bid_archive'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    auction_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    buyer_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    archived_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ProxyBid(Base):
+
+    __tablename__ = 'proxy_bid'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    auction_id: Mapped[int] = mapped_column(ForeignKey('auction.id'))
+    auction: Mapped['Auction'] = relationship('Auction', back_populates='proxy_bids')
+    buyer_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
+    buyer: Mapped['UserProfile'] = relationship('UserProfile', back_populates='proxy_bids')
+    max_amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('auction_id', 'buyer_id', name='uq_proxy_bid_auction_id_buyer_id'),
+    )
+
+
+Index('ix_bid_auction_id_amount', Bid.auction_id, Bid.amount.desc())
+Index('ix_bid_auction_id_created_date', Bid.auction_id, Bid.created_date, Bid.id)
+Index('ix_bid_created_date_id', Bid.created_date, Bid.id)
+# Keys are chosen by clients, so they are unique per buyer. created_date is part of the key because unique indexes
+# on a partitioned table must include the partition key.
+Index('ix_bid_idempotency_key', Bid.buyer_id, Bid.idempotency_key, Bid.created_date, unique=True)
 
 
 class Feedback(Base):
 
     __tablename__ = 'feedback'
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    seller_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    seller_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     seller: Mapped['UserProfile'] = relationship('UserProfile', back_populates='feedback_seller', foreign_keys=[seller_id])
-    buyer_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    buyer_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     buyer: Mapped['UserProfile'] = relationship('UserProfile', back_populates='feedback_buyer', foreign_keys=[buyer_id])
     rating: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+
+Index('ix_feedback_created_date_id', Feedback.created_date, Feedback.id)
+
+
+class SellerReputation(Base):
+
+    __tablename__ = 'seller_reputation'
+    seller_id: Mapped[int] = mapped_column(ForeignKey('user.id'), primary_key=True)
+    seller: Mapped['UserProfile'] = relationship('UserProfile', back_populates='reputation')
+    feedback_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_1: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_2: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_3: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_4: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    rating_5: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,69 @@
+import base64
+import json
+import orjson
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def cursor_value(column, value):
+    # A crafted cursor must not reach the driver with a value of the wrong type.
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if issubclass(python_type, (Enum, Decimal)):
+        return python_type(value)
+    if isinstance(value, python_type) and not isinstance(value, bool):
+        return value
+    raise ValueError(value)
+
+
+def decode_cursor(cursor: str, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail='cursor туура эмес')
+
+
+def apply_keyset(stmt, columns, limit: int, cursor=None, descending=False):
+    if cursor:
+        key, values = tuple_(*columns), tuple_(*decode_cursor(cursor, columns))
+        stmt = stmt.where(key < values if descending else key > values)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def schema_columns(model, schema):
+    return [getattr(model, field) for field in schema.model_fields]
+
+
+def page_content(page) -> dict:
+    return {'items': [row._asdict() for row in page['items']], 'next_cursor': page['next_cursor']}
+
+
+def page_json(page) -> bytes:
+    return orjson.dumps(page_content(page))
+
+
+async def keyset_page(db: AsyncSession, stmt, columns, limit: int, cursor=None, descending=False):
+    result = await db.execute(apply_keyset(stmt, columns, limit, cursor, descending))
+    rows = result.scalars().all() if len(result.keys()) == 1 else result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return {'items': rows, 'next_cursor': next_cursor}
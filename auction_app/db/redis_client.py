@@ -0,0 +1,21 @@
+import redis.asyncio as redis
+from auction_app.config import REDIS_URL
+
+redis_client = None
+
+
+async def init_redis():
+    global redis_client
+    redis_client = redis.Redis.from_url(REDIS_URL, encoding='utf-8', decode_responses=True)
+    return redis_client
+
+
+async def close_redis():
+    global redis_client
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
+
+
+def get_redis():
+    return redis_client
@@ -1,9 +1,31 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from enum import Enum
 from datetime import datetime
 from auction_app.db.models import StatusChoices, StatusFuelChoices, StatusTransmissionsChoices, StatusAuctionChoices
 
+T = TypeVar('T')
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class BulkCreatedSchema(BaseModel):
+    index: int
+    id: int
+
+
+class BulkErrorSchema(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkResultSchema(BaseModel):
+    created: List[BulkCreatedSchema]
+    errors: List[BulkErrorSchema]
+
 
 class UserProfileCreateSchema(BaseModel):
     status: StatusChoices
@@ -20,10 +42,18 @@ class UserProfileSchema(BaseModel):
     phone_number: Optional[str]
 
 
+class CurrentUserSchema(BaseModel):
+    id: int
+    username: str
+    status: StatusChoices
+
+
 class RefreshTokenSchema(BaseModel):
     id: int
-    token: str
+    jti: str
     created_date: datetime
+    expires_at: datetime
+    rotated_at: Optional[datetime]
     user_id: int
 
 
@@ -36,7 +66,6 @@ class CarCreateSchema(BaseModel):
     mileage: int
     price: int
     description: Optional[str]
-    image: str
     seller_id: int
 
 
@@ -50,10 +79,25 @@ class CarSchema(BaseModel):
     mileage: int
     price: int
     description: Optional[str]
-    image: str
+    image: Optional[str]
     seller_id: int
 
 
+class CarImageSchema(BaseModel):
+    image: str
+    thumbnails: Dict[str, str]
+
+
+class UserPublicSchema(BaseModel):
+    id: int
+    username: str
+    status: StatusChoices
+
+
+class CarDetailSchema(CarSchema):
+    seller: UserPublicSchema
+
+
 class AuctionCreateSchema(BaseModel):
     start_price: int
     min_price: Optional[int]
@@ -71,11 +115,13 @@ class AuctionSchema(BaseModel):
     end_time: datetime
     auction_status: StatusAuctionChoices
     car_id: int
+    current_price: Optional[int] = None
+    current_buyer_id: Optional[int] = None
+    bid_count: int = 0
 
 
 class BidCreateSchema(BaseModel):
     amount: int
-    created_date: datetime
     auction_id: int
     buyer_id: int
 
@@ -87,6 +133,50 @@ class BidSchema(BaseModel):
     buyer_id: int
 
 
+class BidAcceptedSchema(BaseModel):
+    idempotency_key: str
+    amount: int
+    created_date: datetime
+    auction_id: int
+    buyer_id: int
+
+
+class ProxyBidCreateSchema(BaseModel):
+    auction_id: int
+    buyer_id: int
+    max_amount: int
+
+
+class ProxyBidSchema(BaseModel):
+    id: int
+    auction_id: int
+    buyer_id: int
+    max_amount: int
+    created_date: datetime
+
+
+class ProxyBidResultSchema(BaseModel):
+    proxy: ProxyBidSchema
+    bids: List[BidSchema]
+
+
+class BidDetailSchema(BidSchema):
+    buyer: UserPublicSchema
+
+
+class AuctionDetailSchema(AuctionSchema):
+    car: CarDetailSchema
+    top_bids: List[BidDetailSchema] = []
+
+
+class SellerReputationSchema(BaseModel):
+    seller_id: int
+    feedback_count: int
+    rating_count: int
+    average_rating: Optional[float]
+    histogram: Dict[str, int]
+
+
 class FeedbackCreateSchema(BaseModel):
     seller_id: int
     buyer_id: int
@@ -1,28 +1,48 @@
+import asyncio
 import fastapi
 from auction_app.db.database import engine
 import uvicorn
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-import redis.asyncio as redis
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi_limiter import FastAPILimiter
+from fastapi.staticfiles import StaticFiles
 from sqladmin import Admin
 from auction_app.admin.setup import setup_admin
-from auction_app.api.endpoints import (auth, user, car, auction,bid, feedback)
+from auction_app.api.endpoints import (auth, user, car, auction,bid, feedback, metrics, export)
 from starlette.middleware.sessions import SessionMiddleware
-from auction_app.config import SECRET_KEY
+from auction_app.config import (SECRET_KEY, REFRESH_TOKEN_PURGE_INTERVAL, BID_ARCHIVE_INTERVAL,
+                                BID_PARTITION_INTERVAL, MEDIA_ROOT, MEDIA_URL, BID_WRITE_BEHIND, BID_FLUSH_INTERVAL)
+from auction_app.db.redis_client import init_redis, close_redis
+from auction_app.services.auction_events import hub
+from auction_app.services.auction_closer import closer
+from auction_app.services.refresh_tokens import purge_expired_refresh_tokens
+from auction_app.services.bid_archive import archive_completed_bids, ensure_bid_partitions
+from auction_app.services.bid_log import flush_bids, file_log
+from auction_app.services.background import run_periodically, cancel_tasks
 
 
-async def init_redis():
-    return redis.Redis.from_url('redis://localhost', encoding='utf-8', decode_responses=True)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis = await init_redis()
-    await FastAPILimiter.init(redis)
+    hub.add_listener(closer.on_event)
+    if BID_WRITE_BEHIND:
+        hub.add_listener(file_log.on_event)
+        await file_log.recover()
+    await hub.start(redis)
+    tasks = [
+        asyncio.create_task(closer.run()),
+        asyncio.create_task(run_periodically(purge_expired_refresh_tokens, REFRESH_TOKEN_PURGE_INTERVAL)),
+        asyncio.create_task(run_periodically(ensure_bid_partitions, BID_PARTITION_INTERVAL)),
+        asyncio.create_task(run_periodically(archive_completed_bids, BID_ARCHIVE_INTERVAL)),
+    ]
+    if BID_WRITE_BEHIND:
+        tasks.append(asyncio.create_task(run_periodically(flush_bids, BID_FLUSH_INTERVAL)))
     yield
-    await redis.close()
+    await cancel_tasks(tasks)
+    await hub.stop()
+    await close_redis()
+    await engine.dispose()
 
 
 auction_app = fastapi.FastAPI(title='Auction', lifespan=lifespan)
@@ -41,6 +61,9 @@ auction_app.include_router(car.car_router)
 auction_app.include_router(auction.auction_router)
 auction_app.include_router(bid.bid_router)
 auction_app.include_router(feedback.feedback_router)
+auction_app.include_router(export.export_router)
+auction_app.include_router(metrics.metrics_router)
+auction_app.mount(MEDIA_URL, StaticFiles(directory=MEDIA_ROOT, check_dir=False), name='media')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Auction, StatusAuctionChoices
+from auction_app.db.database import SessionLocal
+from auction_app.db.redis_client import get_redis
+from auction_app.services.live_cache import invalidate_auction
+from auction_app.services.auction_events import publish_events
+from auction_app.services.deadlines import DeadlineHeap
+from auction_app.services.bid_log import get_bid_log
+from auction_app.config import (AUCTION_CLOSE_INTERVAL, AUCTION_CLOSE_BATCH_SIZE, AUCTION_CLOSE_RESCAN_INTERVAL,
+                                BID_WRITE_BEHIND)
+
+logger = logging.getLogger(__name__)
+
+
+async def unflushed_auctions() -> set:
+    # Their accepted bids are still in the write-behind log, so current_bid_id may not be the winner yet.
+    return await get_bid_log().pending_auctions() if BID_WRITE_BEHIND else set()
+
+
+async def close_auctions(db: AsyncSession, now: datetime, limit: int, auction_ids=None, exclude=()):
+    # SKIP LOCKED lets several workers close disjoint batches and skips auctions a bid is holding.
+    due = (select(Auction.id)
+           .where(Auction.auction_status == StatusAuctionChoices.active, Auction.end_time <= now)
+           .order_by(Auction.end_time)
+           .limit(limit)
+           .with_for_update(skip_locked=True))
+    if auction_ids is not None:
+        due = due.where(Auction.id.in_(auction_ids))
+    if exclude:
+        due = due.where(Auction.id.not_in(exclude))
+    reserve_met = or_(Auction.min_price.is_(None), Auction.current_price >= Auction.min_price)
+    result = await db.execute(
+        update(Auction)
+        .where(Auction.id.in_(due.scalar_subquery()))
+        .values(auction_status=StatusAuctionChoices.completed,
+                winner_bid_id=case((reserve_met, Auction.current_bid_id), else_=None))
+        .returning(Auction.id, Auction.winner_bid_id, Auction.current_price, Auction.current_buyer_id)
+        .execution_options(synchronize_session=False)
+    )
+    closed = result.all()
+    await db.commit()
+    return closed
+
+
+async def announce_closed(closed):
+    redis = get_redis()
+    await invalidate_auction(redis, *[auction.id for auction in closed])
+    await publish_events(redis, [
+        (auction.id, {
+            'type': 'closed',
+            'winner_bid_id': auction.winner_bid_id,
+            'buyer_id': auction.current_buyer_id if auction.winner_bid_id is not None else None,
+            'amount': auction.current_price if auction.winner_bid_id is not None else None,
+        })
+        for auction in closed
+    ])
+
+
+async def close_due_batch():
+    async with SessionLocal() as db:
+        closed = await close_auctions(db, datetime.utcnow(), AUCTION_CLOSE_BATCH_SIZE,
+                                      exclude=await unflushed_auctions())
+    if closed:
+        await announce_closed(closed)
+    return len(closed) == AUCTION_CLOSE_BATCH_SIZE
+
+
+class AuctionCloser:
+
+    def __init__(self):
+        self.deadlines = DeadlineHeap()
+        self.wakeup = asyncio.Event()
+
+    def schedule(self, auction_id: int, end_time: datetime):
+        if self.deadlines.schedule(auction_id, end_time):
+            self.wakeup.set()
+
+    def on_event(self, auction_id: int, message: str):
+        event = json.loads(message)
+        if event['type'] in ('bid', 'scheduled'):
+            self.schedule(auction_id, datetime.fromisoformat(event['end_time']))
+        elif event['type'] == 'closed':
+            self.deadlines.cancel(auction_id)
+
+    async def load(self):
+        query = select(Auction.id, Auction.end_time).where(Auction.auction_status == StatusAuctionChoices.active)
+        async with SessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=10000))
+            async for auction_id, end_time in result:
+                self.deadlines.schedule(auction_id, end_time)
+
+    async def close(self, auction_ids, now: datetime):
+        async with SessionLocal() as db:
+            closed = await close_auctions(db, now, len(auction_ids), auction_ids, await unflushed_auctions())
+            pending = set(auction_ids) - {auction.id for auction in closed}
+            if pending:
+                # Extended by a late bid, locked by a bid or another worker right now, or waiting for a flush.
+                result = await db.execute(select(Auction.id, Auction.end_time).where(
+                    Auction.id.in_(pending), Auction.auction_status == StatusAuctionChoices.active))
+                retry_at = now + timedelta(seconds=AUCTION_CLOSE_INTERVAL)
+                for auction_id, end_time in result:
+                    self.schedule(auction_id, end_time if end_time > now else retry_at)
+        if closed:
+            await announce_closed(closed)
+
+    async def tick(self):
+        now = datetime.utcnow()
+        due = self.deadlines.pop_due(now)
+        for start in range(0, len(due), AUCTION_CLOSE_BATCH_SIZE):
+            await self.close(due[start:start + AUCTION_CLOSE_BATCH_SIZE], now)
+
+    async def run(self):
+        while True:
+            try:
+                await self.load()
+                break
+            except Exception:
+                logger.exception('auction closer could not load deadlines')
+                await asyncio.sleep(AUCTION_CLOSE_INTERVAL)
+
+        next_rescan = time.monotonic() + AUCTION_CLOSE_RESCAN_INTERVAL
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.tick()
+                if time.monotonic() >= next_rescan:
+                    while await close_due_batch():
+                        pass
+                    next_rescan = time.monotonic() + AUCTION_CLOSE_RESCAN_INTERVAL
+            except Exception:
+                logger.exception('auction closer failed')
+                await asyncio.sleep(AUCTION_CLOSE_INTERVAL)
+                continue
+
+            timeout = next_rescan - time.monotonic()
+            deadline = self.deadlines.next_deadline()
+            if deadline is not None:
+                timeout = min(timeout, (deadline - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+closer = AuctionCloser()
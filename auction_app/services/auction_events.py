@@ -0,0 +1,110 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from redis.exceptions import RedisError
+from auction_app.config import AUCTION_STREAM_QUEUE_SIZE, AUCTION_STREAM_HEARTBEAT
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'auction:events:'
+PING = json.dumps({'type': 'ping'})
+
+
+class Subscription:
+
+    def __init__(self, auction_id: int, size: int):
+        self.auction_id = auction_id
+        self.queue = asyncio.Queue(size)
+
+    async def receive(self):
+        try:
+            return await asyncio.wait_for(self.queue.get(), AUCTION_STREAM_HEARTBEAT)
+        except asyncio.TimeoutError:
+            return PING
+
+
+class AuctionEventHub:
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = defaultdict(set)
+        self.listeners = []
+        self.task = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def subscribe(self, auction_id: int) -> Subscription:
+        subscription = Subscription(auction_id, self.queue_size)
+        self.subscribers[auction_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.auction_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.auction_id]
+
+    def drop(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def dispatch(self, auction_id: int, message: str):
+        for listener in self.listeners:
+            listener(auction_id, message)
+        for subscription in list(self.subscribers.get(auction_id, ())):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.drop(subscription)
+
+    async def listen(self, redis):
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(CHANNEL_PREFIX + '*')
+                    async for message in pubsub.listen():
+                        if message['type'] == 'pmessage':
+                            self.dispatch(int(message['channel'][len(CHANNEL_PREFIX):]), message['data'])
+            except RedisError:
+                logger.warning('auction event subscription lost, reconnecting', exc_info=True)
+                await asyncio.sleep(1)
+
+    async def start(self, redis):
+        if redis is not None:
+            self.task = asyncio.create_task(self.listen(redis))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+hub = AuctionEventHub(AUCTION_STREAM_QUEUE_SIZE)
+
+
+async def publish_events(redis, events):
+    messages = [(auction_id, json.dumps({'auction_id': auction_id, **event})) for auction_id, event in events]
+    if redis is not None:
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for auction_id, message in messages:
+                    pipe.publish(CHANNEL_PREFIX + str(auction_id), message)
+                await pipe.execute()
+            return
+        except RedisError:
+            logger.warning('auction event publish failed, delivering locally', exc_info=True)
+    for auction_id, message in messages:
+        hub.dispatch(auction_id, message)
+
+
+async def publish_event(redis, auction_id: int, event: dict):
+    await publish_events(redis, [(auction_id, event)])
@@ -0,0 +1,21 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(job, interval: float):
+    while True:
+        try:
+            busy = await job()
+        except Exception:
+            logger.exception('background job %s failed', job.__name__)
+            busy = False
+        if not busy:
+            await asyncio.sleep(interval)
+
+
+async def cancel_tasks(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, literal, text
+from auction_app.db.models import Auction, Bid, BidArchive, StatusAuctionChoices
+from auction_app.db.database import SessionLocal
+from auction_app.config import BID_ARCHIVE_AFTER_DAYS, BID_ARCHIVE_BATCH_SIZE, BID_PARTITION_MONTHS_AHEAD
+
+
+def month_start(value: datetime, offset: int = 0) -> datetime:
+    month = value.year * 12 + value.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f'bid_y{start.year}m{start.month:02d}'
+
+
+async def ensure_bid_partitions():
+    async with SessionLocal() as db:
+        if db.bind.dialect.name != 'postgresql':
+            return False
+        if await db.scalar(text("SELECT relkind FROM pg_class WHERE relname = 'bid'")) != 'p':
+            return False
+        now = datetime.utcnow()
+        for offset in range(BID_PARTITION_MONTHS_AHEAD + 1):
+            start, end = month_start(now, offset), month_start(now, offset + 1)
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF bid "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+        await db.commit()
+    return False
+
+
+async def archive_completed_bids():
+    cutoff = datetime.utcnow() - timedelta(days=BID_ARCHIVE_AFTER_DAYS)
+    finished = (select(Auction.id)
+                .where(Auction.auction_status != StatusAuctionChoices.active, Auction.end_time < cutoff))
+    batch = (select(Bid.id).where(Bid.auction_id.in_(finished))
+             .order_by(Bid.id).limit(BID_ARCHIVE_BATCH_SIZE))
+    async with SessionLocal() as db:
+        bid_ids = (await db.scalars(batch)).all()
+        if not bid_ids:
+            return False
+        now = datetime.utcnow()
+        await db.execute(insert(BidArchive).from_select(
+            ['id', 'amount', 'created_date', 'auction_id', 'buyer_id', 'archived_date'],
+            select(Bid.id, Bid.amount, Bid.created_date, Bid.auction_id, Bid.buyer_id, literal(now))
+            .where(Bid.id.in_(bid_ids))
+        ))
+        await db.execute(delete(Bid).where(Bid.id.in_(bid_ids)).execution_options(synchronize_session=False))
+        await db.commit()
+    return len(bid_ids) == BID_ARCHIVE_BATCH_SIZE
@@ -0,0 +1,279 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Auction, Bid, ProxyBid, StatusAuctionChoices
+from auction_app.db.database import SessionLocal
+from auction_app.db.redis_client import get_redis
+from auction_app.services.live_cache import cache_auction
+from auction_app.services.auction_events import publish_events
+from auction_app.services.bid_log import get_bid_log, drain_auction
+from auction_app.config import (BID_MIN_INCREMENT, SOFT_CLOSE_WINDOW_SECONDS, SOFT_CLOSE_EXTENSION_SECONDS,
+                                BID_WRITE_BEHIND)
+
+logger = logging.getLogger(__name__)
+
+
+class BidError(Exception):
+    status_code = 400
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class AuctionNotFound(BidError):
+    status_code = 404
+
+
+class AuctionClosed(BidError):
+    status_code = 409
+
+
+class BidTooLow(BidError):
+    status_code = 409
+
+
+class BidLogUnavailable(BidError):
+    status_code = 503
+
+
+def minimum_bid(auction: Auction, price: Optional[int] = None) -> int:
+    price = auction.current_price if price is None else price
+    if price is None:
+        return auction.start_price
+    return price + BID_MIN_INCREMENT
+
+
+def extended_end_time(end_time: datetime, now: datetime) -> datetime:
+    if SOFT_CLOSE_WINDOW_SECONDS and end_time - now < timedelta(seconds=SOFT_CLOSE_WINDOW_SECONDS):
+        return max(end_time, now + timedelta(seconds=SOFT_CLOSE_EXTENSION_SECONDS))
+    return end_time
+
+
+def check_open(auction: Optional[Auction], now: datetime):
+    if auction is None:
+        raise AuctionNotFound('Мындай аукцион жок')
+    if auction.auction_status != StatusAuctionChoices.active or not auction.start_time <= now < auction.end_time:
+        raise AuctionClosed('Аукцион жабык')
+
+
+async def announce_bids(auction: Auction, bids: list, previous_buyer_id: Optional[int]):
+    redis = get_redis()
+    await cache_auction(redis, auction)
+    events = []
+    first_count = auction.bid_count - len(bids) + 1
+    for bid_count, bid in enumerate(bids, first_count):
+        events.append((auction.id, {
+            'type': 'bid', 'bid_id': bid.id, 'buyer_id': bid.buyer_id, 'amount': bid.amount,
+            'bid_count': bid_count, 'end_time': auction.end_time.isoformat(),
+        }))
+        if previous_buyer_id is not None and previous_buyer_id != bid.buyer_id:
+            events.append((auction.id, {'type': 'outbid', 'buyer_id': previous_buyer_id, 'amount': bid.amount}))
+        previous_buyer_id = bid.buyer_id
+    await publish_events(redis, events)
+
+
+async def announce_bid(auction: Auction, bid: Bid, previous_buyer_id: Optional[int]):
+    await announce_bids(auction, [bid], previous_buyer_id)
+
+
+async def lock_auction(db: AsyncSession, auction_id: int) -> Optional[Auction]:
+    query = (select(Auction).where(Auction.id == auction_id)
+             .with_for_update().execution_options(populate_existing=True))
+    return await db.scalar(query)
+
+
+async def load_proxies(db: AsyncSession, auction_id: int) -> list:
+    query = (select(ProxyBid).where(ProxyBid.auction_id == auction_id)
+             .order_by(ProxyBid.created_date, ProxyBid.id))
+    return (await db.scalars(query)).all()
+
+
+def resolve_proxies(auction: Auction, price: Optional[int], leader: Optional[int], proxies: list) -> list:
+    # Collapses the whole auto-bid war into at most two visible bids: the runner-up at its limit and the
+    # winner one increment above it (second-price). The standing leader and then older proxies win ties.
+    minimum = minimum_bid(auction, price)
+    limits = {} if leader is None else {leader: price}
+    for proxy in proxies:
+        if proxy.buyer_id == leader:
+            limits[leader] = max(price, proxy.max_amount)
+        elif proxy.max_amount >= minimum:
+            limits[proxy.buyer_id] = proxy.max_amount
+    ranked = sorted(limits.items(), key=lambda item: -item[1])
+    if not ranked or (ranked[0][0] == leader and len(ranked) == 1):
+        return []
+
+    (winner, limit), rest = ranked[0], ranked[1:]
+    final = min(limit, rest[0][1] + BID_MIN_INCREMENT) if rest else minimum
+    bids = []
+    if rest:
+        runner, runner_limit = rest[0]
+        if (price is None or runner_limit > price) and runner_limit < final:
+            bids.append((runner, runner_limit))
+    if winner != leader or final > price:
+        bids.append((winner, final))
+    return bids
+
+
+async def write_bids(db: AsyncSession, auction: Auction, items: list, now: datetime,
+                     idempotency_key: Optional[str] = None) -> list:
+    rows = [{'amount': amount, 'created_date': now, 'auction_id': auction.id, 'buyer_id': buyer_id}
+            for buyer_id, amount in items]
+    rows[0]['idempotency_key'] = idempotency_key
+    for row in rows[1:]:
+        row['idempotency_key'] = None
+    bids = (await db.scalars(insert(Bid).returning(Bid, sort_by_parameter_order=True), rows)).all()
+    previous_buyer_id, last = auction.current_buyer_id, bids[-1]
+
+    # bid_count doubles as a version so backends without FOR UPDATE (SQLite) still reject a lost race,
+    # and the status and end time are re-checked so such a bid cannot land after the auction closed.
+    result = await db.execute(
+        update(Auction)
+        .where(Auction.id == auction.id, Auction.bid_count == auction.bid_count,
+               Auction.auction_status == StatusAuctionChoices.active, Auction.end_time > now)
+        .values(current_price=last.amount, current_bid_id=last.id, current_buyer_id=last.buyer_id,
+                bid_count=Auction.bid_count + len(bids), end_time=extended_end_time(auction.end_time, now))
+    )
+    if result.rowcount != 1:
+        auction_id = auction.id
+        await db.rollback()
+        check_open(await db.get(Auction, auction_id, populate_existing=True), now)
+        raise BidTooLow('Ставка жогорураак баа менен алдыга чыгып кетти')
+    await db.commit()
+    await announce_bids(auction, bids, previous_buyer_id)
+    return bids
+
+
+async def place_bid(db: AsyncSession, auction_id: int, buyer_id: int, amount: int,
+                    idempotency_key: Optional[str] = None) -> Bid:
+    now = datetime.utcnow()
+    auction = await lock_auction(db, auction_id)
+    check_open(auction, now)
+    if amount < minimum_bid(auction):
+        raise BidTooLow(f'Ставка {minimum_bid(auction)} же андан жогору болушу керек')
+
+    proxies = await load_proxies(db, auction_id)
+    items = [(buyer_id, amount)] + resolve_proxies(auction, amount, buyer_id, proxies)
+    return (await write_bids(db, auction, items, now, idempotency_key))[0]
+
+
+async def accept_bid(auction_id: int, buyer_id: int, amount: int, idempotency_key: str) -> dict:
+    # Write-behind path: the bid log validates and records the bid, the flusher writes it to the bid table later.
+    # Only a miss or the synchronous fallback opens a session, so accepted bids never wait on the pool.
+    now = datetime.utcnow()
+    bid_log = get_bid_log()
+    try:
+        code, result, previous_buyer_id = await bid_log.accept(auction_id, buyer_id, amount, idempotency_key, now)
+        if code == 'miss':
+            async with SessionLocal() as db:
+                auction = await db.get(Auction, auction_id)
+                write_through = await db.scalar(select(ProxyBid.id).where(ProxyBid.auction_id == auction_id).limit(1))
+            if auction is not None:
+                await bid_log.prime(auction, write_through is not None)
+                code, result, previous_buyer_id = await bid_log.accept(auction_id, buyer_id, amount,
+                                                                       idempotency_key, now)
+    except (RedisError, OSError):
+        logger.warning('bid log unavailable, writing bid directly', exc_info=True)
+        code = 'sync'
+
+    if code == 'closed':
+        raise AuctionClosed('Аукцион жабык')
+    if code == 'low':
+        raise BidTooLow(f'Ставка {result} же андан жогору болушу керек')
+    if code in ('ok', 'dup'):
+        if code == 'ok':
+            events = [(auction_id, {'type': 'bid', 'bid_id': None, 'buyer_id': buyer_id, 'amount': amount,
+                                    'bid_count': int(result['bid_count']), 'end_time': result['end_time']})]
+            if previous_buyer_id is not None and previous_buyer_id != buyer_id:
+                events.append((auction_id, {'type': 'outbid', 'buyer_id': previous_buyer_id, 'amount': amount}))
+            await publish_events(get_redis(), events)
+        return result
+
+    await drain_log(auction_id)
+    async with SessionLocal() as db:
+        # Without the log's dedup a retried request is matched against the bid table instead.
+        bid = await db.scalar(select(Bid).where(Bid.buyer_id == buyer_id, Bid.idempotency_key == idempotency_key)
+                              .limit(1))
+        if bid is None:
+            bid = await place_bid(db, auction_id, buyer_id, amount, idempotency_key)
+    return {'idempotency_key': idempotency_key, 'amount': bid.amount, 'created_date': bid.created_date,
+            'auction_id': bid.auction_id, 'buyer_id': bid.buyer_id}
+
+
+async def drain_log(auction_id: int):
+    # The synchronous engine validates against the database, so every bid the log already acknowledged for this
+    # auction has to be there first. Callers pin the auction beforehand so no new entries arrive meanwhile.
+    try:
+        drained = await drain_auction(auction_id)
+    except (RedisError, OSError):
+        logger.warning('bid log unavailable, cannot drain auction %s', auction_id, exc_info=True)
+        drained = False
+    if not drained:
+        raise BidLogUnavailable('Ставкалар убактылуу кабыл алынбай жатат, кайра аракет кылыңыз')
+
+
+async def pin_synchronous(auction_id: int):
+    if BID_WRITE_BEHIND:
+        await get_bid_log().pin(auction_id)
+        await drain_log(auction_id)
+
+
+async def place_bids(db: AsyncSession, auction_id: int, items: list):
+    try:
+        await pin_synchronous(auction_id)
+        now = datetime.utcnow()
+        auction = await lock_auction(db, auction_id)
+        check_open(auction, now)
+    except BidError as error:
+        await db.rollback()
+        return [], [(index, error) for index, _, _ in items]
+
+    accepted, errors = [], []
+    price, leader = auction.current_price, auction.current_buyer_id
+    for index, buyer_id, amount in items:
+        minimum = minimum_bid(auction, price)
+        if amount < minimum:
+            errors.append((index, BidTooLow(f'Ставка {minimum} же андан жогору болушу керек')))
+            continue
+        accepted.append((index, buyer_id, amount))
+        price, leader = amount, buyer_id
+    if not accepted:
+        await db.rollback()
+        return [], errors
+
+    proxies = await load_proxies(db, auction_id)
+    items = [(buyer_id, amount) for _, buyer_id, amount in accepted] + resolve_proxies(auction, price, leader, proxies)
+    try:
+        bids = await write_bids(db, auction, items, now)
+    except BidError as error:
+        return [], errors + [(index, error) for index, _, _ in accepted]
+    return [(index, bid) for (index, _, _), bid in zip(accepted, bids)], errors
+
+
+async def set_proxy_bid(db: AsyncSession, auction_id: int, buyer_id: int, max_amount: int):
+    await pin_synchronous(auction_id)
+    now = datetime.utcnow()
+    auction = await lock_auction(db, auction_id)
+    check_open(auction, now)
+    leading = auction.current_buyer_id == buyer_id
+    floor = auction.current_price if leading else minimum_bid(auction)
+    if max_amount < floor:
+        raise BidTooLow(f'Максималдуу ставка {floor} же андан жогору болушу керек')
+
+    insert_proxy = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert_proxy(ProxyBid).values(auction_id=auction_id, buyer_id=buyer_id, max_amount=max_amount,
+                                         created_date=now)
+    proxy = await db.scalar(stmt.on_conflict_do_update(index_elements=[ProxyBid.auction_id, ProxyBid.buyer_id],
+                                                       set_={'max_amount': max_amount})
+                            .returning(ProxyBid).execution_options(populate_existing=True))
+    items = resolve_proxies(auction, auction.current_price, auction.current_buyer_id,
+                            await load_proxies(db, auction_id))
+    bids = await write_bids(db, auction, items, now) if items else []
+    if not items:
+        await db.commit()
+    return proxy, bids
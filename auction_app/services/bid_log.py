@@ -0,0 +1,437 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, case, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.exceptions import ResponseError
+from auction_app.db.models import Auction, Bid, StatusAuctionChoices
+from auction_app.db.database import SessionLocal
+from auction_app.db.redis_client import get_redis
+from auction_app.services.live_cache import live_key, timestamp, cache_auction, pin_write_through
+from auction_app.services.lru import LRUDict
+from auction_app.config import (BID_MIN_INCREMENT, SOFT_CLOSE_WINDOW_SECONDS, SOFT_CLOSE_EXTENSION_SECONDS,
+                                BID_STREAM_KEY, BID_STREAM_GROUP, BID_PENDING_KEY, BID_DEAD_LETTER_KEY, BID_LOG_PATH,
+                                BID_FLUSH_BATCH_SIZE, BID_FLUSH_CLAIM_IDLE, BID_FLUSH_INTERVAL, BID_DRAIN_TIMEOUT, BID_IDEMPOTENCY_TTL, BID_LOCAL_STATE_TTL,
+                                BID_LOCAL_STATE_KEYS, LIVE_AUCTION_CACHE_TTL)
+
+logger = logging.getLogger(__name__)
+
+# Validates a bid against the live auction hash, advances it, appends the bid to the stream and counts it as
+# pending for its auction in one step.
+# Returns {'ok', entry, previous_buyer_id}, {'dup', entry}, {'low', minimum}, {'closed'}, {'miss'} or
+# {'sync'} for auctions pinned to the synchronous engine.
+ACCEPT_SCRIPT = """
+local seen = redis.call('GET', KEYS[3])
+if seen then
+    return {'dup', seen}
+end
+local state = redis.call('HMGET', KEYS[1], 'auction_status', 'start_ts', 'end_ts', 'end_time', 'current_price',
+                         'start_price', 'bid_count', 'current_buyer_id', 'write_through')
+if not state[1] then
+    return {'miss'}
+end
+if state[9] then
+    return {'sync'}
+end
+local now = tonumber(ARGV[5])
+if state[1] ~= 'active' or now < tonumber(state[2]) or now >= tonumber(state[3]) then
+    return {'closed'}
+end
+local minimum = tonumber(state[6])
+if state[5] ~= '' then
+    minimum = tonumber(state[5]) + tonumber(ARGV[7])
+end
+if tonumber(ARGV[3]) < minimum then
+    return {'low', tostring(minimum)}
+end
+local end_ts, end_time = state[3], state[4]
+if tonumber(end_ts) - now < tonumber(ARGV[8]) and tonumber(ARGV[9]) > tonumber(end_ts) then
+    end_ts, end_time = ARGV[9], ARGV[10]
+end
+local bid_count = tostring(tonumber(state[7]) + 1)
+redis.call('HSET', KEYS[1], 'current_price', ARGV[3], 'current_buyer_id', ARGV[2], 'current_bid_id', '',
+           'bid_count', bid_count, 'end_ts', end_ts, 'end_time', end_time)
+-- The hash is now ahead of the database, so it must outlive its unflushed bids rather than be re-primed stale.
+redis.call('EXPIRE', KEYS[1], ARGV[12])
+redis.call('XADD', KEYS[2], '*', 'auction_id', ARGV[1], 'buyer_id', ARGV[2], 'amount', ARGV[3],
+           'idempotency_key', ARGV[4], 'created_date', ARGV[6], 'bid_count', bid_count, 'end_time', end_time)
+local entry = cjson.encode({auction_id=ARGV[1], buyer_id=ARGV[2], amount=ARGV[3], idempotency_key=ARGV[4],
+                            created_date=ARGV[6], bid_count=bid_count, end_time=end_time})
+redis.call('SET', KEYS[3], entry, 'EX', ARGV[11])
+redis.call('HINCRBY', KEYS[4], ARGV[1], 1)
+return {'ok', entry, state[8]}
+"""
+
+# ARGV is the group followed by entry id / auction id pairs. Only entries this call acknowledges release their
+# auction's pending count, so a redelivered batch cannot release it twice.
+ACK_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    if redis.call('XACK', KEYS[1], ARGV[1], ARGV[i]) == 1
+            and redis.call('HINCRBY', KEYS[2], ARGV[i + 1], -1) <= 0 then
+        redis.call('HDEL', KEYS[2], ARGV[i + 1])
+    end
+    redis.call('XDEL', KEYS[1], ARGV[i])
+end
+return 1
+"""
+
+
+def accept_args(auction_id: int, buyer_id: int, amount: int, idempotency_key: str, now: datetime) -> list:
+    extended = now + timedelta(seconds=SOFT_CLOSE_EXTENSION_SECONDS)
+    return [auction_id, buyer_id, amount, idempotency_key, timestamp(now), now.isoformat(), BID_MIN_INCREMENT,
+            SOFT_CLOSE_WINDOW_SECONDS, timestamp(extended), extended.isoformat(), BID_IDEMPOTENCY_TTL,
+            LIVE_AUCTION_CACHE_TTL]
+
+
+def seen_key(buyer_id: int, idempotency_key: str) -> str:
+    return f'bid:idempotency:{buyer_id}:{idempotency_key}'
+
+
+class RedisBidLog:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.script = redis.register_script(ACCEPT_SCRIPT)
+        self.ack_script = redis.register_script(ACK_SCRIPT)
+        self.consumer = f'{socket.gethostname()}:{os.getpid()}'
+        self.group_ready = False
+
+    async def accept(self, auction_id: int, buyer_id: int, amount: int, idempotency_key: str, now: datetime):
+        keys = [live_key(auction_id), BID_STREAM_KEY, seen_key(buyer_id, idempotency_key), BID_PENDING_KEY]
+        result = await self.script(keys=keys, args=accept_args(auction_id, buyer_id, amount, idempotency_key, now))
+        code = result[0]
+        if code in ('ok', 'dup'):
+            previous = result[2] if code == 'ok' and result[2] else None
+            return code, json.loads(result[1]), int(previous) if previous else None
+        return code, result[1] if len(result) > 1 else None, None
+
+    async def prime(self, auction: Auction, write_through: bool):
+        await cache_auction(self.redis, auction)
+        if write_through:
+            await self.pin(auction.id)
+
+    async def pin(self, auction_id: int):
+        await pin_write_through(self.redis, auction_id)
+
+    async def ensure_group(self):
+        if self.group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(BID_STREAM_KEY, BID_STREAM_GROUP, id='0', mkstream=True)
+        except ResponseError as error:
+            if 'BUSYGROUP' not in str(error):
+                raise
+        self.group_ready = True
+
+    async def read(self, count: int) -> list:
+        await self.ensure_group()
+        # Entries a crashed or failed flush left unacknowledged are taken over once they have been idle long enough.
+        claimed = await self.redis.xautoclaim(BID_STREAM_KEY, BID_STREAM_GROUP, self.consumer,
+                                              min_idle_time=BID_FLUSH_CLAIM_IDLE * 1000, start_id='0-0', count=count)
+        entries = [entry for entry in claimed[1] if entry[1]]
+        if entries:
+            return entries
+        response = await self.redis.xreadgroup(BID_STREAM_GROUP, self.consumer, {BID_STREAM_KEY: '>'}, count=count)
+        return response[0][1] if response else []
+
+    async def ack(self, entries: list):
+        args = [BID_STREAM_GROUP]
+        for entry_id, fields in entries:
+            args += [entry_id, fields['auction_id']]
+        await self.ack_script(keys=[BID_STREAM_KEY, BID_PENDING_KEY], args=args)
+
+    async def dead_letter(self, entries: list):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for fields in entries:
+                pipe.xadd(BID_DEAD_LETTER_KEY, fields)
+            await pipe.execute()
+
+    async def pending_auctions(self) -> set:
+        return {int(auction_id) for auction_id in await self.redis.hkeys(BID_PENDING_KEY)}
+
+    async def has_pending(self, auction_id: int) -> bool:
+        return bool(await self.redis.hexists(BID_PENDING_KEY, str(auction_id)))
+
+
+class FileBidLog:
+    # Single-process stand-in for the Redis stream: live auction state is kept in memory and bids are appended
+    # to a file, fsynced before the bid is acknowledged. Flushed entries are tracked by byte offset.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset_path = path + '.offset'
+        self.dead_path = path + '.dead'
+        self.states = {}
+        self.pending = defaultdict(int)
+        self.recovered = {}
+        self.seen = LRUDict(BID_LOCAL_STATE_KEYS)
+        self.lock = asyncio.Lock()
+        self.file = None
+        self.offset = None
+
+    def on_event(self, auction_id: int, message: str):
+        state = self.states.get(auction_id)
+        if state is None:
+            return
+        event = json.loads(message)
+        if event['type'] == 'closed':
+            del self.states[auction_id]
+        elif event['type'] == 'bid' and event['bid_count'] > state.get('bid_count', 0):
+            state.update(current_price=event['amount'], current_buyer_id=event['buyer_id'],
+                         bid_count=event['bid_count'], end_time=datetime.fromisoformat(event['end_time']))
+
+    def expired(self, auction_id: int, state: dict) -> bool:
+        # Re-reading a stale state from the database is only safe while none of its bids are waiting in the log.
+        return state['expires'] <= time.monotonic() and not self.pending[auction_id]
+
+    async def accept(self, auction_id: int, buyer_id: int, amount: int, idempotency_key: str, now: datetime):
+        key = seen_key(buyer_id, idempotency_key)
+        if key in self.seen:
+            return 'dup', self.seen[key], None
+        state = self.states.get(auction_id)
+        if state is None or 'auction_status' not in state or self.expired(auction_id, state):
+            return 'miss', None, None
+        if state['write_through']:
+            return 'sync', None, None
+        if (state['auction_status'] != StatusAuctionChoices.active
+                or not state['start_time'] <= now < state['end_time']):
+            return 'closed', None, None
+        minimum = state['start_price'] if state['current_price'] is None else state['current_price'] + BID_MIN_INCREMENT
+        if amount < minimum:
+            return 'low', minimum, None
+
+        previous = dict(state)
+        end_time = state['end_time']
+        if SOFT_CLOSE_WINDOW_SECONDS and end_time - now < timedelta(seconds=SOFT_CLOSE_WINDOW_SECONDS):
+            end_time = max(end_time, now + timedelta(seconds=SOFT_CLOSE_EXTENSION_SECONDS))
+        state.update(current_price=amount, current_buyer_id=buyer_id, bid_count=state['bid_count'] + 1,
+                     end_time=end_time)
+        entry = {'auction_id': str(auction_id), 'buyer_id': str(buyer_id), 'amount': str(amount),
+                 'idempotency_key': idempotency_key, 'created_date': now.isoformat(),
+                 'bid_count': str(state['bid_count']), 'end_time': end_time.isoformat()}
+        self.pending[auction_id] += 1
+        self.seen[key] = entry
+        try:
+            async with self.lock:
+                await asyncio.to_thread(self.append, json.dumps(entry) + '\n')
+        except OSError:
+            self.pending[auction_id] -= 1
+            self.seen.pop(key, None)
+            if self.states.get(auction_id) is state and state['bid_count'] == int(entry['bid_count']):
+                state.clear()
+                state.update(previous)
+            raise
+        return 'ok', entry, previous['current_buyer_id']
+
+    def append(self, line: str):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(line)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    async def prime(self, auction: Auction, write_through: bool):
+        current = self.states.get(auction.id, {})
+        write_through = write_through or current.get('write_through', False)
+        expires = time.monotonic() + BID_LOCAL_STATE_TTL
+        # Concurrent first bids each re-prime after a miss; like WRITE_SCRIPT, a state that is not behind the
+        # database, or still has bids to flush, is kept rather than rolled back.
+        if 'auction_status' in current and (current['bid_count'] >= auction.bid_count or self.pending[auction.id]):
+            current.update(write_through=write_through, expires=expires)
+            return
+        state = {field: getattr(auction, field) for field in ('auction_status', 'start_time', 'end_time',
+                                                              'start_price', 'current_price', 'current_buyer_id',
+                                                              'bid_count')}
+        last = self.recovered.pop(auction.id, None)
+        if last is not None and int(last['bid_count']) > auction.bid_count:
+            state.update(current_price=int(last['amount']), current_buyer_id=int(last['buyer_id']),
+                         bid_count=int(last['bid_count']),
+                         end_time=max(auction.end_time, datetime.fromisoformat(last['end_time'])))
+        state.update(write_through=write_through, expires=expires)
+        self.states[auction.id] = state
+
+    async def pin(self, auction_id: int):
+        self.states.setdefault(auction_id, {})['write_through'] = True
+
+    def load_offset(self) -> int:
+        try:
+            with open(self.offset_path, encoding='utf-8') as file:
+                return int(file.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def read_lines(self, offset: int, count: int) -> list:
+        entries = []
+        try:
+            with open(self.path, 'rb') as file:
+                file.seek(offset)
+                while len(entries) < count:
+                    line = file.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    entries.append((offset, json.loads(line)))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    async def recover(self):
+        # Bids acknowledged before a restart but not flushed yet keep their auctions pending, stay deduplicated and
+        # are replayed over the database row when the auction is primed again.
+        self.offset = await asyncio.to_thread(self.load_offset)
+        for _, fields in await asyncio.to_thread(self.read_lines, self.offset, float('inf')):
+            auction_id = int(fields['auction_id'])
+            self.pending[auction_id] += 1
+            self.recovered[auction_id] = fields
+            self.seen[seen_key(int(fields['buyer_id']), fields['idempotency_key'])] = fields
+
+    async def read(self, count: int) -> list:
+        if self.offset is None:
+            self.offset = await asyncio.to_thread(self.load_offset)
+        return await asyncio.to_thread(self.read_lines, self.offset, count)
+
+    def store_offset(self, offset: int):
+        if self.file is not None and offset == self.file.tell():
+            # Everything written so far is in the database, so the log can start over.
+            self.file.truncate(0)
+            self.file.seek(0)
+            offset = 0
+        with open(self.offset_path + '.part', 'w', encoding='utf-8') as file:
+            file.write(str(offset))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(self.offset_path + '.part', self.offset_path)
+        return offset
+
+    async def ack(self, entries: list):
+        async with self.lock:
+            self.offset = await asyncio.to_thread(self.store_offset, entries[-1][0])
+        for _, fields in entries:
+            auction_id = int(fields['auction_id'])
+            self.pending[auction_id] = max(0, self.pending[auction_id] - 1)
+
+    def append_dead(self, lines: str):
+        with open(self.dead_path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+    async def dead_letter(self, entries: list):
+        await asyncio.to_thread(self.append_dead, ''.join(json.dumps(fields) + '\n' for fields in entries))
+
+    async def pending_auctions(self) -> set:
+        return {auction_id for auction_id, count in self.pending.items() if count}
+
+    async def has_pending(self, auction_id: int) -> bool:
+        return self.pending.get(auction_id, 0) > 0
+
+
+file_log = FileBidLog(BID_LOG_PATH)
+redis_log = None
+# One flush at a time per process: the file log hands out entries by offset, so concurrent reads would overlap.
+flush_lock = asyncio.Lock()
+
+
+def get_bid_log():
+    global redis_log
+    redis = get_redis()
+    if redis is None:
+        return file_log
+    if redis_log is None or redis_log.redis is not redis:
+        redis_log = RedisBidLog(redis)
+    return redis_log
+
+
+def entry_key(fields: dict) -> tuple:
+    return int(fields['buyer_id']), fields['idempotency_key']
+
+
+async def write_logged_bids(db: AsyncSession, entries: list) -> list:
+    # Locked so the closer cannot finalise an auction between this check and the update; sorted like the closer.
+    active = set(await db.scalars(
+        select(Auction.id)
+        .where(Auction.id.in_({int(fields['auction_id']) for fields in entries}),
+               Auction.auction_status == StatusAuctionChoices.active)
+        .order_by(Auction.id)
+        .with_for_update()))
+    rejected = [fields for fields in entries if int(fields['auction_id']) not in active]
+    entries = [fields for fields in entries if int(fields['auction_id']) in active]
+    if not entries:
+        await db.commit()
+        return rejected
+
+    rows = [{'amount': int(fields['amount']), 'created_date': datetime.fromisoformat(fields['created_date']),
+             'auction_id': int(fields['auction_id']), 'buyer_id': int(fields['buyer_id']),
+             'idempotency_key': fields['idempotency_key']} for fields in entries]
+    insert_bid = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    stmt = (insert_bid(Bid).values(rows)
+            .on_conflict_do_nothing(index_elements=[Bid.buyer_id, Bid.idempotency_key, Bid.created_date])
+            .returning(Bid.buyer_id, Bid.idempotency_key, Bid.id))
+    inserted = {(buyer_id, key): bid_id for buyer_id, key, bid_id in await db.execute(stmt)}
+
+    # Replayed entries were applied together with their first insert, so only new rows move the auction.
+    auctions = defaultdict(list)
+    for fields in entries:
+        if entry_key(fields) in inserted:
+            auctions[int(fields['auction_id'])].append(fields)
+    for auction_id, bids in auctions.items():
+        last = bids[-1]
+        amount, end_time = int(last['amount']), datetime.fromisoformat(last['end_time'])
+        # Synchronous writes for the same auction may have landed in between; the higher price stays current.
+        higher = or_(Auction.current_price.is_(None), Auction.current_price < amount)
+        await db.execute(
+            update(Auction)
+            .where(Auction.id == auction_id, Auction.auction_status == StatusAuctionChoices.active)
+            .values(bid_count=Auction.bid_count + len(bids),
+                    current_price=case((higher, amount), else_=Auction.current_price),
+                    current_bid_id=case((higher, inserted[entry_key(last)]), else_=Auction.current_bid_id),
+                    current_buyer_id=case((higher, int(last['buyer_id'])), else_=Auction.current_buyer_id),
+                    end_time=case((Auction.end_time < end_time, end_time), else_=Auction.end_time))
+        )
+    await db.commit()
+    return rejected
+
+
+async def refresh_live_state(db: AsyncSession, auction_ids: set):
+    # At an equal bid_count the flushed row is authoritative, so a live state that drifted from it is repaired.
+    redis = get_redis()
+    if redis is None or not auction_ids:
+        return
+    for auction in await db.scalars(select(Auction).where(Auction.id.in_(auction_ids))):
+        await cache_auction(redis, auction, replace_equal=True)
+
+
+async def flush_bids():
+    async with flush_lock:
+        bid_log = get_bid_log()
+        entries = await bid_log.read(BID_FLUSH_BATCH_SIZE)
+        if not entries:
+            return False
+        async with SessionLocal() as db:
+            rejected = await write_logged_bids(db, [fields for _, fields in entries])
+            await refresh_live_state(db, {int(fields['auction_id']) for _, fields in entries}
+                                     - {int(fields['auction_id']) for fields in rejected})
+        if rejected:
+            logger.warning('%d logged bids arrived after their auction closed', len(rejected))
+            await bid_log.dead_letter(rejected)
+        await bid_log.ack(entries)
+        return len(entries) == BID_FLUSH_BATCH_SIZE
+
+
+async def drain_auction(auction_id: int) -> bool:
+    # Entries another worker has claimed are flushed by it, so those are waited for rather than read here.
+    bid_log = get_bid_log()
+    deadline = time.monotonic() + BID_DRAIN_TIMEOUT
+    while await bid_log.has_pending(auction_id):
+        if time.monotonic() >= deadline:
+            return False
+        if not await flush_bids() and await bid_log.has_pending(auction_id):
+            await asyncio.sleep(BID_FLUSH_INTERVAL)
+    return True
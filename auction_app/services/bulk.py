@@ -0,0 +1,70 @@
+from collections import defaultdict
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Car, UserProfile
+from auction_app.services.bid_engine import place_bids
+from auction_app.services.car_facets import car_facets, adjust_facets
+from auction_app.config import BULK_CHUNK_SIZE
+
+
+def chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def validate_items(schema, items: list):
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as error:
+            errors.append({'index': index, 'detail': error.errors(include_url=False, include_context=False)})
+    return valid, errors
+
+
+async def insert_cars(db: AsyncSession, items: list):
+    created, errors = [], []
+    seller_ids = {car.seller_id for _, car in items}
+    sellers = set(await db.scalars(select(UserProfile.id).where(UserProfile.id.in_(seller_ids))))
+    pending = {}
+    for index, car in items:
+        if car.seller_id not in sellers:
+            errors.append({'index': index, 'detail': 'Мындай сатуучу жок'})
+        elif car.brand in pending:
+            errors.append({'index': index, 'detail': 'Мындай brand бар экен'})
+        else:
+            pending[car.brand] = index, car
+
+    insert = pg_insert if db.bind.dialect.name == 'postgresql' else sqlite_insert
+    for chunk in chunks(list(pending.values())):
+        rows = [car.model_dump() for _, car in chunk]
+        # Brands that already exist are skipped by the database instead of failing the whole chunk.
+        result = await db.execute(insert(Car).on_conflict_do_nothing(index_elements=[Car.brand])
+                                  .returning(Car.id, Car.brand), rows)
+        inserted = {brand: car_id for car_id, brand in result}
+        await adjust_facets(db, added=[facet for _, car in chunk if car.brand in inserted for facet in car_facets(car)])
+        await db.commit()
+        for index, car in chunk:
+            if car.brand in inserted:
+                created.append({'index': index, 'id': inserted[car.brand]})
+            else:
+                errors.append({'index': index, 'detail': 'Мындай brand бар экен'})
+    return created, errors
+
+
+async def insert_bids(db: AsyncSession, items: list):
+    created, errors = [], []
+    by_auction = defaultdict(list)
+    for index, bid in items:
+        by_auction[bid.auction_id].append((index, bid.buyer_id, bid.amount))
+
+    # One auction lock at a time, taken in id order, so concurrent batches cannot deadlock.
+    for auction_id in sorted(by_auction):
+        for chunk in chunks(by_auction[auction_id]):
+            placed, failed = await place_bids(db, auction_id, chunk)
+            created.extend({'index': index, 'id': bid.id} for index, bid in placed)
+            errors.extend({'index': index, 'detail': error.detail} for index, error in failed)
+    return created, errors
@@ -0,0 +1,82 @@
+import asyncio
+from collections import Counter, defaultdict
+from sqlalchemy import select, delete, func, case, literal, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Car, CarFacet
+from auction_app.db.database import SessionLocal
+from auction_app.config import CAR_PRICE_BUCKETS
+
+FACETS = ('fuel_status', 'transmission_status', 'brand', 'price')
+
+
+def bucket_labels():
+    bounds = (0,) + CAR_PRICE_BUCKETS
+    return [f'{low}-{high}' for low, high in zip(bounds, bounds[1:])] + [f'{bounds[-1]}+']
+
+
+def price_bucket(price: int) -> str:
+    labels = bucket_labels()
+    for bound, label in zip(CAR_PRICE_BUCKETS, labels):
+        if price < bound:
+            return label
+    return labels[-1]
+
+
+def price_bucket_expression():
+    labels = bucket_labels()
+    return case(*[(Car.price < bound, label) for bound, label in zip(CAR_PRICE_BUCKETS, labels)], else_=labels[-1])
+
+
+def car_facets(car) -> list:
+    return [('fuel_status', car.fuel_status.value), ('transmission_status', car.transmission_status.value),
+            ('brand', car.brand), ('price', price_bucket(car.price))]
+
+
+def upsert(dialect: str, rows: list):
+    insert = pg_insert if dialect == 'postgresql' else sqlite_insert
+    stmt = insert(CarFacet).values(rows)
+    return stmt.on_conflict_do_update(index_elements=[CarFacet.facet, CarFacet.value],
+                                      set_={'count': CarFacet.count + stmt.excluded.count})
+
+
+async def adjust_facets(db: AsyncSession, removed=(), added=()):
+    delta = Counter(added)
+    delta.subtract(Counter(removed))
+    # Sorted so concurrent writers lock the shared facet rows in the same order.
+    rows = [{'facet': facet, 'value': value, 'count': count} for (facet, value), count in sorted(delta.items())
+            if count]
+    if rows:
+        await db.execute(upsert(db.bind.dialect.name, rows))
+
+
+async def get_facets(db: AsyncSession) -> dict:
+    result = await db.execute(select(CarFacet.facet, CarFacet.value, CarFacet.count).where(CarFacet.count > 0))
+    facets = {facet: {} for facet in FACETS}
+    for facet, value, count in result:
+        facets.setdefault(facet, {})[value] = count
+    return facets
+
+
+async def rebuild_facets():
+    groups = [(literal('fuel_status'), Car.fuel_status), (literal('transmission_status'), Car.transmission_status),
+              (literal('brand'), Car.brand), (literal('price'), price_bucket_expression())]
+    async with SessionLocal() as db:
+        if db.bind.dialect.name == 'postgresql':
+            # Writers adjusting facets wait here, so no car change falls between the count and the swap.
+            await db.execute(text('LOCK TABLE car_facet IN EXCLUSIVE MODE'))
+        counts = defaultdict(int)
+        for facet, column in groups:
+            result = await db.execute(select(facet, column, func.count()).group_by(column))
+            for name, value, count in result:
+                counts[(name, getattr(value, 'value', value))] += count
+        await db.execute(delete(CarFacet))
+        if counts:
+            rows = [{'facet': facet, 'value': value, 'count': count} for (facet, value), count in counts.items()]
+            await db.execute(upsert(db.bind.dialect.name, rows))
+        await db.commit()
+
+
+if __name__ == '__main__':
+    asyncio.run(rebuild_facets())
@@ -0,0 +1,18 @@
+from sqlalchemy import Integer, column, or_, text
+from auction_app.db.models import Car, CAR_SEARCH_VECTOR
+
+SORT_COLUMNS = {'id': Car.id, 'price': Car.price, 'mileage': Car.mileage, 'year': Car.year}
+
+
+def fts_query(q: str) -> str:
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def text_filter(dialect: str, q: str):
+    if dialect == 'postgresql':
+        return text(f"{CAR_SEARCH_VECTOR} @@ plainto_tsquery('simple', :q)").bindparams(q=q)
+    if dialect == 'sqlite':
+        matches = text('SELECT rowid FROM car_fts WHERE car_fts MATCH :q').bindparams(q=fts_query(q))
+        return Car.id.in_(matches.columns(column('rowid', Integer)))
+    pattern = f'%{q}%'
+    return or_(Car.brand.ilike(pattern), Car.model.ilike(pattern), Car.description.ilike(pattern))
@@ -0,0 +1,39 @@
+import heapq
+from datetime import datetime
+from typing import Optional
+
+
+class DeadlineHeap:
+
+    def __init__(self):
+        self.heap = []
+        self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def schedule(self, auction_id: int, end_time: datetime) -> bool:
+        if self.deadlines.get(auction_id) == end_time:
+            return False
+        earliest = self.next_deadline()
+        self.deadlines[auction_id] = end_time
+        heapq.heappush(self.heap, (end_time, auction_id))
+        return earliest is None or end_time < earliest
+
+    def cancel(self, auction_id: int):
+        self.deadlines.pop(auction_id, None)
+
+    def pop_due(self, now: datetime):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            end_time, auction_id = heapq.heappop(self.heap)
+            if self.deadlines.get(auction_id) == end_time:
+                del self.deadlines[auction_id]
+                due.append(auction_id)
+        return due
+
+    def next_deadline(self) -> Optional[datetime]:
+        # Rescheduled and cancelled auctions leave stale entries behind; drop them lazily.
+        while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from redis.exceptions import RedisError
+from auction_app.db.models import Auction, StatusAuctionChoices
+from auction_app.config import LIVE_AUCTION_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+INT_FIELDS = ('id', 'start_price', 'min_price', 'car_id', 'current_price', 'current_buyer_id', 'bid_count')
+TIME_FIELDS = ('start_time', 'end_time')
+
+# Writes carry bid_count so a delayed write-through can never replace a newer state. A state with the same count
+# may have been advanced by the bid log, so only a write that read the flushed database (ARGV[3] = 1) replaces it.
+WRITE_SCRIPT = """
+local count = redis.call('HGET', KEYS[1], 'bid_count')
+if count and tonumber(count) >= tonumber(ARGV[1]) + tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def live_key(auction_id: int) -> str:
+    return f'auction:live:{auction_id}'
+
+
+def timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def auction_state(auction: Auction) -> dict:
+    state = {field: '' if getattr(auction, field) is None else str(getattr(auction, field)) for field in INT_FIELDS}
+    state.update({field: getattr(auction, field).isoformat() for field in TIME_FIELDS})
+    state['auction_status'] = auction.auction_status.value
+    state['start_ts'] = str(timestamp(auction.start_time))
+    state['end_ts'] = str(timestamp(auction.end_time))
+    return state
+
+
+def parse_state(state: dict) -> dict:
+    data = {field: int(state[field]) if state[field] else None for field in INT_FIELDS}
+    data.update({field: datetime.fromisoformat(state[field]) for field in TIME_FIELDS})
+    data['auction_status'] = StatusAuctionChoices(state['auction_status'])
+    return data
+
+
+async def get_live_auction(redis, auction_id: int) -> Optional[dict]:
+    if redis is None:
+        return None
+    try:
+        state = await redis.hgetall(live_key(auction_id))
+    except RedisError:
+        logger.warning('live auction cache read failed', exc_info=True)
+        return None
+    if not state or state.get('auction_status') != StatusAuctionChoices.active.value:
+        return None
+    return parse_state(state)
+
+
+async def cache_auction(redis, auction: Auction, replace_equal: bool = False):
+    if redis is None:
+        return
+    if auction.auction_status != StatusAuctionChoices.active:
+        await invalidate_auction(redis, auction.id)
+        return
+    state = auction_state(auction)
+    args = [state['bid_count'], LIVE_AUCTION_CACHE_TTL, int(replace_equal)]
+    for field, value in state.items():
+        args.extend((field, value))
+    try:
+        await redis.register_script(WRITE_SCRIPT)(keys=[live_key(auction.id)], args=args)
+    except RedisError:
+        logger.warning('live auction cache write failed', exc_info=True)
+
+
+async def pin_write_through(redis, auction_id: int):
+    # Write-behind bids are refused for a pinned auction until its cache entry is rebuilt.
+    if redis is None:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(live_key(auction_id), 'write_through', '1')
+            pipe.expire(live_key(auction_id), LIVE_AUCTION_CACHE_TTL)
+            await pipe.execute()
+    except RedisError:
+        logger.warning('live auction cache write failed', exc_info=True)
+
+
+async def invalidate_auction(redis, *auction_ids: int):
+    if redis is None or not auction_ids:
+        return
+    try:
+        await redis.delete(*[live_key(auction_id) for auction_id in auction_ids])
+    except RedisError:
+        logger.warning('live auction cache invalidation failed', exc_info=True)
@@ -0,0 +1,32 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from auction_app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
+
+# min_rounds makes hashes made with a lower cost count as deprecated, so login upgrades them.
+password_context = CryptContext(schemes=['bcrypt'], deprecated='auto',
+                                bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
+executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+in_flight = 0
+
+
+async def run_hashing(func, *args):
+    global in_flight
+    if in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(status_code=503, detail='Сервер бош эмес, кийинчерээк аракет кылыңыз',
+                            headers={'Retry-After': '1'})
+    in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        in_flight -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await run_hashing(password_context.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await run_hashing(password_context.verify_and_update, password, hashed)
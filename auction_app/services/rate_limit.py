@@ -0,0 +1,132 @@
+import logging
+import math
+import time
+from fastapi import HTTPException, Request
+from jose import jwt, JWTError
+from redis.exceptions import RedisError
+from auction_app.db.redis_client import get_redis
+from auction_app.services.lru import LRUDict
+from auction_app.services.token_cache import token_cache, token_key
+from auction_app.config import (SECRET_KEY, ALGORITHM, RATE_LIMIT_POLICIES, RATE_LIMIT_LEASE_FRACTION,
+                                RATE_LIMIT_LOCAL_KEYS)
+
+logger = logging.getLogger(__name__)
+
+# Token bucket: refills continuously, grants up to ARGV[3] tokens, returns {granted, retry_after}.
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+local retry_after = 0
+if granted == 0 then
+    retry_after = (1 - tokens) / refill
+end
+return {granted, tostring(retry_after)}
+"""
+
+
+class MemoryRateLimitBackend:
+
+    def __init__(self):
+        self.buckets = LRUDict(RATE_LIMIT_LOCAL_KEYS)
+
+    async def take(self, key: str, capacity: int, refill: float, requested: int):
+        now = time.monotonic()
+        tokens, ts = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - ts) * refill)
+        granted = min(requested, int(tokens))
+        tokens -= granted
+        self.buckets[key] = (tokens, now)
+        return granted, 0 if granted else (1 - tokens) / refill
+
+
+class RedisRateLimitBackend:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.script = redis.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: int, refill: float, requested: int):
+        granted, retry_after = await self.script(keys=[key], args=[capacity, refill, requested])
+        return int(granted), float(retry_after)
+
+
+memory_backend = MemoryRateLimitBackend()
+redis_backend = None
+
+
+def get_backend():
+    global redis_backend
+    redis = get_redis()
+    if redis is None:
+        return memory_backend
+    if redis_backend is None or redis_backend.redis is not redis:
+        redis_backend = RedisRateLimitBackend(redis)
+    return redis_backend
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else 'unknown'
+
+
+def user_identity(request: Request) -> str:
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        claims = token_cache.get(token_key(token))
+        if claims is None:
+            try:
+                claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                claims = None
+        if claims and 'uid' in claims:
+            return f"user:{claims['uid']}"
+    return f'ip:{client_ip(request)}'
+
+
+class RateLimit:
+
+    def __init__(self, policy: str):
+        config = RATE_LIMIT_POLICIES[policy]
+        self.policy = policy
+        self.key = config['key']
+        self.capacity = config['times']
+        self.seconds = config['seconds']
+        self.refill = config['times'] / config['seconds']
+        self.lease_size = max(1, int(config['times'] * RATE_LIMIT_LEASE_FRACTION))
+        self.leases = LRUDict(RATE_LIMIT_LOCAL_KEYS)
+
+    def identity(self, request: Request) -> str:
+        if self.key == 'route':
+            return 'route'
+        if self.key == 'user':
+            return user_identity(request)
+        return f'ip:{client_ip(request)}'
+
+    async def __call__(self, request: Request):
+        key = f'ratelimit:{self.policy}:{self.identity(request)}'
+        now = time.monotonic()
+        lease = self.leases.get(key)
+        if lease is not None and lease[0] > 0 and lease[1] > now:
+            lease[0] -= 1
+            return
+
+        try:
+            granted, retry_after = await get_backend().take(key, self.capacity, self.refill, self.lease_size)
+        except RedisError:
+            logger.warning('rate limit backend unavailable, allowing request', exc_info=True)
+            return
+        if granted == 0:
+            raise HTTPException(status_code=429, detail='Суроо-талаптар өтө көп',
+                                headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+        if granted > 1:
+            self.leases[key] = [granted - 1, now + self.seconds]
@@ -0,0 +1,24 @@
+import hashlib
+from datetime import datetime
+from sqlalchemy import select, delete
+from auction_app.db.models import RefreshToken
+from auction_app.db.database import SessionLocal
+from auction_app.config import REFRESH_TOKEN_PURGE_BATCH_SIZE
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def purge_expired_refresh_tokens():
+    expired = (select(RefreshToken.id)
+               .where(RefreshToken.expires_at < datetime.utcnow())
+               .limit(REFRESH_TOKEN_PURGE_BATCH_SIZE))
+    async with SessionLocal() as db:
+        result = await db.execute(
+            delete(RefreshToken)
+            .where(RefreshToken.id.in_(expired.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return result.rowcount == REFRESH_TOKEN_PURGE_BATCH_SIZE
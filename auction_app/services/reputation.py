@@ -0,0 +1,93 @@
+import asyncio
+from collections import defaultdict
+from sqlalchemy import select, insert, delete, func, case, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from auction_app.db.models import Feedback, SellerReputation, UserProfile
+from auction_app.db.database import SessionLocal
+from auction_app.config import REPUTATION_BACKFILL_BATCH_SIZE
+
+RATINGS = range(1, 6)
+COUNTERS = ['feedback_count', 'rating_count', 'rating_sum'] + [f'rating_{rating}' for rating in RATINGS]
+
+
+def feedback_entry(feedback) -> tuple:
+    return feedback.seller_id, feedback.rating
+
+
+def entry_counts(rating) -> dict:
+    counts = dict.fromkeys(COUNTERS, 0)
+    counts['feedback_count'] = 1
+    if rating is not None:
+        counts['rating_count'] = 1
+        counts['rating_sum'] = rating
+        counts[f'rating_{rating}'] = 1
+    return counts
+
+
+def upsert(dialect: str, rows: list):
+    stmt = (pg_insert if dialect == 'postgresql' else sqlite_insert)(SellerReputation).values(rows)
+    columns = SellerReputation.__table__.c
+    return stmt.on_conflict_do_update(index_elements=[SellerReputation.seller_id],
+                                      set_={counter: columns[counter] + stmt.excluded[counter] for counter in COUNTERS})
+
+
+async def adjust_reputation(db: AsyncSession, removed=(), added=()):
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for entries, sign in ((added, 1), (removed, -1)):
+        for seller_id, rating in entries:
+            for counter, value in entry_counts(rating).items():
+                deltas[seller_id][counter] += sign * value
+    # Sorted so concurrent writers lock the seller rows in the same order.
+    rows = [{'seller_id': seller_id, **counts} for seller_id, counts in sorted(deltas.items())
+            if any(counts.values())]
+    if rows:
+        await db.execute(upsert(db.bind.dialect.name, rows))
+
+
+def reputation_data(seller_id: int, reputation) -> dict:
+    if reputation is None:
+        reputation = SellerReputation(seller_id=seller_id, **dict.fromkeys(COUNTERS, 0))
+    average = round(reputation.rating_sum / reputation.rating_count, 2) if reputation.rating_count else None
+    return {
+        'seller_id': seller_id,
+        'feedback_count': reputation.feedback_count,
+        'rating_count': reputation.rating_count,
+        'average_rating': average,
+        'histogram': {str(rating): getattr(reputation, f'rating_{rating}') for rating in RATINGS},
+    }
+
+
+async def backfill_chunk(db: AsyncSession, first_id: int, last_id: int):
+    if db.bind.dialect.name == 'postgresql':
+        # Feedback writers wait here, so none of their deltas is lost when the chunk is replaced.
+        await db.execute(text('LOCK TABLE seller_reputation IN EXCLUSIVE MODE'))
+    result = await db.execute(
+        select(Feedback.seller_id, func.count(), func.count(Feedback.rating),
+               func.coalesce(func.sum(Feedback.rating), 0),
+               *[func.count(case((Feedback.rating == rating, 1))) for rating in RATINGS])
+        .where(Feedback.seller_id.between(first_id, last_id))
+        .group_by(Feedback.seller_id)
+    )
+    rows = [dict(zip(['seller_id'] + COUNTERS, row)) for row in result]
+    await db.execute(delete(SellerReputation).where(SellerReputation.seller_id.between(first_id, last_id)))
+    if rows:
+        await db.execute(insert(SellerReputation), rows)
+
+
+async def backfill_reputation():
+    last_id = 0
+    while True:
+        async with SessionLocal() as db:
+            ids = (await db.scalars(select(UserProfile.id).where(UserProfile.id > last_id)
+                                    .order_by(UserProfile.id).limit(REPUTATION_BACKFILL_BATCH_SIZE))).all()
+            if not ids:
+                return
+            await backfill_chunk(db, ids[0], ids[-1])
+            await db.commit()
+        last_id = ids[-1]
+
+
+if __name__ == '__main__':
+    asyncio.run(backfill_reputation())
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from redis.exceptions import RedisError
+from auction_app.db.redis_client import get_redis
+from auction_app.config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_LOCAL_TTL, RESPONSE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(request: Request) -> str:
+    return f'{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}'
+
+
+def namespace_key(namespace: str) -> str:
+    return f'respcache:{namespace}'
+
+
+def generation_key(namespace: str) -> str:
+    return f'respcache:{namespace}:generation'
+
+
+# Stores a body only if no worker invalidated the namespace since the generation was read with the lookup.
+SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+class ResponseCache:
+
+    def __init__(self, maxsize: int, local_ttl: int, ttl: int):
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+
+    def get_local(self, namespace: str, key: str):
+        entry = self.entries.get((namespace, key))
+        if entry is None:
+            return None
+        etag, body, generation, expires = entry
+        if generation != self.generations.get(namespace, 0) or expires <= time.monotonic():
+            del self.entries[(namespace, key)]
+            return None
+        self.entries.move_to_end((namespace, key))
+        return etag, body
+
+    def set_local(self, namespace: str, key: str, etag: str, body: bytes):
+        generation = self.generations.get(namespace, 0)
+        self.entries[(namespace, key)] = (etag, body, generation, time.monotonic() + self.local_ttl)
+        self.entries.move_to_end((namespace, key))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def get(self, redis, namespace: str, key: str):
+        # Returns the entry and, on a miss, the shared generation a later set() has to match.
+        entry = self.get_local(namespace, key)
+        if entry is not None or redis is None:
+            return entry, None
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.get(generation_key(namespace))
+                pipe.hget(namespace_key(namespace), key)
+                shared_generation, value = await pipe.execute()
+        except RedisError:
+            logger.warning('response cache read failed', exc_info=True)
+            return None, None
+        if value is None:
+            return None, shared_generation or '0'
+        etag, _, body = value.partition(' ')
+        entry = etag, body.encode()
+        self.set_local(namespace, key, *entry)
+        return entry, None
+
+    async def set(self, redis, namespace: str, key: str, etag: str, body: bytes, generation: int,
+                  shared_generation=None):
+        if generation != self.generations.get(namespace, 0):
+            return
+        self.set_local(namespace, key, etag, body)
+        if redis is None or shared_generation is None:
+            return
+        try:
+            await redis.register_script(SET_SCRIPT)(
+                keys=[namespace_key(namespace), generation_key(namespace)],
+                args=[shared_generation, key, f'{etag} {body.decode()}', self.ttl])
+        except RedisError:
+            logger.warning('response cache write failed', exc_info=True)
+
+    async def invalidate(self, redis, *namespaces: str):
+        for namespace in namespaces:
+            self.generations[namespace] = self.generations.get(namespace, 0) + 1
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                for namespace in namespaces:
+                    pipe.incr(generation_key(namespace))
+                pipe.delete(*[namespace_key(namespace) for namespace in namespaces])
+                await pipe.execute()
+        except RedisError:
+            logger.warning('response cache invalidation failed', exc_info=True)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_LOCAL_TTL, RESPONSE_CACHE_TTL)
+
+
+async def cached_response(request: Request, namespace: str, serialize, load) -> Response:
+    key = cache_key(request)
+    generation = response_cache.generations.get(namespace, 0)
+    entry, shared_generation = await response_cache.get(get_redis(), namespace, key)
+    if entry is None:
+        body = serialize(await load())
+        entry = make_etag(body), body
+        await response_cache.set(get_redis(), namespace, key, *entry, generation, shared_generation)
+
+    etag, body = entry
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def adapter_json(adapter):
+    return lambda data: adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+async def invalidate_responses(*namespaces: str):
+    await response_cache.invalidate(get_redis(), *namespaces)
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Tuple
+from auction_app.config import MEDIA_ROOT, MEDIA_URL
+
+
+def content_key(digest: str, extension: str, prefix: str = 'images') -> str:
+    return f'{prefix}/{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
+class Storage(ABC):
+
+    @abstractmethod
+    async def save(self, chunks: AsyncIterator[bytes], extension: str) -> Tuple[str, bool]:
+        """Store the upload and return its key and whether this call created it."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def path(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+
+class LocalStorage(Storage):
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def url(self, key: str) -> str:
+        return f'{self.base_url}/{key}'
+
+    def publish(self, temp_path: str, key: str) -> bool:
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        return True
+
+    async def save(self, chunks: AsyncIterator[bytes], extension: str) -> Tuple[str, bool]:
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    await asyncio.to_thread(file.write, chunk)
+            key = content_key(digest.hexdigest(), extension)
+            # Identical uploads hash to the same key, so a duplicate only costs the temporary file.
+            created = await asyncio.to_thread(self.publish, temp_path, key)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return key, created
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.remove, self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+storage = LocalStorage(MEDIA_ROOT, MEDIA_URL)
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from auction_app.services.storage import storage
+from auction_app.config import THUMBNAIL_SIZES, THUMBNAIL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnail')
+
+SIGNATURES = [(b'\xff\xd8\xff', 'jpg'), (b'\x89PNG\r\n\x1a\n', 'png'), (b'GIF87a', 'gif'), (b'GIF89a', 'gif')]
+
+
+def image_extension(head: bytes):
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def thumbnail_key(key: str, size: int) -> str:
+    stem = os.path.splitext(key.split('/', 1)[1])[0]
+    return f'thumbnails/{stem}_{size}.jpg'
+
+
+def thumbnail_urls(key: str) -> dict:
+    return {str(size): storage.url(thumbnail_key(key, size)) for size in THUMBNAIL_SIZES}
+
+
+def make_thumbnails(key: str):
+    with Image.open(storage.path(key)) as image:
+        # Lets the JPEG decoder scale down while decoding instead of inflating the full image first.
+        image.draft('RGB', (max(THUMBNAIL_SIZES), max(THUMBNAIL_SIZES)))
+        image = image.convert('RGB')
+        for size in THUMBNAIL_SIZES:
+            path = storage.path(thumbnail_key(key, size))
+            if os.path.exists(path):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.part'
+            thumbnail.save(temp_path, 'JPEG', quality=85, optimize=True)
+            os.replace(temp_path, path)
+
+
+async def generate_thumbnails(key: str):
+    try:
+        await asyncio.get_running_loop().run_in_executor(executor, make_thumbnails, key)
+    except Exception:
+        logger.exception('thumbnail generation failed for %s', key)
@@ -0,0 +1,70 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from auction_app.config import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key: bytes):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        claims, expires = entry
+        if expires <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return claims
+
+    def set(self, key: bytes, claims: dict):
+        ttl = min(self.ttl, claims['exp'] - time.time())
+        if ttl <= 0:
+            return
+        self.entries[key] = (claims, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, key: bytes):
+        self.entries.pop(key, None)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+def token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def revoked_key(jti: str) -> str:
+    return f'auth:revoked:{jti}'
+
+
+async def is_revoked(redis, jti: str) -> bool:
+    if redis is None:
+        return False
+    try:
+        return bool(await redis.exists(revoked_key(jti)))
+    except RedisError:
+        logger.warning('token denylist lookup failed', exc_info=True)
+        return False
+
+
+async def revoke(redis, claims: dict):
+    ttl = int(claims['exp'] - time.time()) + 1
+    if redis is None or ttl <= 0:
+        return
+    try:
+        await redis.set(revoked_key(claims['jti']), 1, ex=ttl)
+    except RedisError:
+        logger.warning('token revocation failed', exc_info=True)
@@ -0,0 +1,43 @@
+"""Per-request cost of get_current_user: verified-token cache hit, cold JWT decode, and a DB lookup."""
+from bench.common import reset_database, seed_auction, best_of, report, run
+import fakeredis
+from sqlalchemy import select
+from auction_app.db import redis_client
+from auction_app.db.database import SessionLocal
+from auction_app.db.models import UserProfile
+from auction_app.api.endpoints.auth import get_current_user, create_access_token, user_claims
+from auction_app.services.token_cache import token_cache
+
+REQUESTS = 10000
+
+
+async def main():
+    await reset_database()
+    _, buyer_id, _ = await seed_auction()
+    redis_client.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    async with SessionLocal() as db:
+        token = create_access_token(user_claims(await db.get(UserProfile, buyer_id)))
+
+    async def cached():
+        for _ in range(REQUESTS):
+            await get_current_user(token)
+
+    async def cold():
+        for _ in range(REQUESTS):
+            token_cache.entries.clear()
+            await get_current_user(token)
+
+    async def database():
+        # What a per-request user lookup would cost instead of trusting the token.
+        async with SessionLocal() as db:
+            for _ in range(REQUESTS // 10):
+                await db.scalar(select(UserProfile).where(UserProfile.id == buyer_id))
+
+    await get_current_user(token)
+    report('cache hit', await best_of(cached), REQUESTS, 'req')
+    report('decode + denylist (fakeredis)', await best_of(cold), REQUESTS, 'req')
+    report('user row lookup', await best_of(database), REQUESTS // 10, 'req')
+
+
+if __name__ == '__main__':
+    run(main)
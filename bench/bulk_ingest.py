@@ -0,0 +1,59 @@
+"""Rows per second for the single-item create paths versus /car/bulk/ and /bid/bulk/ services."""
+from datetime import datetime
+from bench.common import reset_database, seed_auction, best_of, report, run
+from auction_app.db.database import SessionLocal
+from auction_app.db.models import Car
+from auction_app.db.schema import CarCreateSchema, BidCreateSchema
+from auction_app.services.bid_engine import place_bid
+from auction_app.services.bulk import insert_cars, insert_bids
+from auction_app.services.car_facets import car_facets, adjust_facets
+
+ITEMS = 1000
+
+
+def cars(seller_id: int, prefix: str) -> list:
+    return [(index, CarCreateSchema(brand=f'{prefix}{index}', model='m', year=datetime(2020, 1, 1), fuel_status='gas',
+                                    transmission_status='automatic', mileage=index, price=index, description='-',
+                                    seller_id=seller_id))
+            for index in range(ITEMS)]
+
+
+async def main():
+    await reset_database()
+    seller_id, buyer_id, auction_id = await seed_auction()
+    runs = iter(range(1000))
+    price = iter(range(10, 10 ** 9))
+
+    async def single_cars():
+        # Same work as car_create: one add/commit/refresh per row.
+        for _, car in cars(seller_id, f'single{next(runs)}-'):
+            async with SessionLocal() as db:
+                car_db = Car(**car.model_dump())
+                db.add(car_db)
+                await adjust_facets(db, added=car_facets(car_db))
+                await db.commit()
+                await db.refresh(car_db)
+
+    async def bulk_cars():
+        async with SessionLocal() as db:
+            await insert_cars(db, cars(seller_id, f'bulk{next(runs)}-'))
+
+    async def single_bids():
+        for _ in range(ITEMS):
+            async with SessionLocal() as db:
+                await place_bid(db, auction_id, buyer_id, next(price))
+
+    async def bulk_bids():
+        items = [(index, BidCreateSchema(amount=next(price), auction_id=auction_id, buyer_id=buyer_id))
+                 for index in range(ITEMS)]
+        async with SessionLocal() as db:
+            await insert_bids(db, items)
+
+    report('cars: one per request', await best_of(single_cars, 3), ITEMS)
+    report('cars: bulk', await best_of(bulk_cars, 3), ITEMS)
+    report('bids: one per request', await best_of(single_bids, 3), ITEMS)
+    report('bids: bulk', await best_of(bulk_bids, 3), ITEMS)
+
+
+if __name__ == '__main__':
+    run(main)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DB_URL'] = os.getenv('BENCH_DB_URL', f'sqlite+aiosqlite:///{DB_PATH}')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from datetime import datetime, timedelta
+from auction_app.db.database import engine, Base, SessionLocal
+from auction_app.db.models import (UserProfile, Car, Auction, StatusChoices, StatusFuelChoices,
+                                   StatusTransmissionsChoices, StatusAuctionChoices)
+
+
+async def reset_database():
+    if engine.url.get_backend_name() == 'sqlite' and os.path.exists(engine.url.database):
+        await engine.dispose()
+        os.remove(engine.url.database)
+    async with engine.begin() as conn:
+        if engine.url.get_backend_name() != 'sqlite':
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_auction():
+    async with SessionLocal() as db:
+        seller = UserProfile(status=StatusChoices.seller, username='seller', hash_password='-')
+        buyer = UserProfile(status=StatusChoices.buyer, username='buyer', hash_password='-')
+        db.add_all([seller, buyer])
+        await db.flush()
+        car = Car(brand='seed', model='m', year=datetime(2020, 1, 1), fuel_status=StatusFuelChoices.gas,
+                  transmission_status=StatusTransmissionsChoices.automatic, mileage=1, price=1, description='-',
+                  seller_id=seller.id)
+        db.add(car)
+        await db.flush()
+        now = datetime.utcnow()
+        auction = Auction(start_price=1, start_time=now - timedelta(hours=1), end_time=now + timedelta(days=1),
+                          auction_status=StatusAuctionChoices.active, car_id=car.id)
+        db.add(auction)
+        await db.commit()
+        return seller.id, buyer.id, auction.id
+
+
+async def best_of(job, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await job()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float, count: int, unit: str = 'rows'):
+    print(f'{name:<32} {seconds * 1000:9.1f} ms  {count / seconds:12,.0f} {unit}/s')
+
+
+def run(main):
+    async def wrapper():
+        try:
+            await main()
+        finally:
+            await engine.dispose()
+    asyncio.run(wrapper())
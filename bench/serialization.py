@@ -0,0 +1,53 @@
+"""10k-row list reads: ORM instances through response_model versus column rows encoded with orjson."""
+import json
+from datetime import datetime
+from bench.common import reset_database, seed_auction, best_of, report, run
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select, insert
+from auction_app.db.database import SessionLocal
+from auction_app.db.models import Bid, Car, StatusFuelChoices, StatusTransmissionsChoices
+from auction_app.db.schema import BidSchema, CarSchema, Page
+from auction_app.db.pagination import keyset_page, schema_columns, page_json
+
+ROWS = 10000
+
+
+async def seed():
+    seller_id, buyer_id, auction_id = await seed_auction()
+    async with SessionLocal() as db:
+        await db.execute(insert(Bid), [{'amount': i, 'auction_id': auction_id, 'buyer_id': buyer_id,
+                                        'created_date': datetime(2024, 1, 1)} for i in range(ROWS)])
+        await db.execute(insert(Car), [{'brand': f'brand{i}', 'model': 'm', 'year': datetime(2020, 1, 1),
+                                        'fuel_status': StatusFuelChoices.gas,
+                                        'transmission_status': StatusTransmissionsChoices.automatic,
+                                        'mileage': i, 'price': i, 'description': '-', 'seller_id': seller_id}
+                                       for i in range(ROWS)])
+        await db.commit()
+
+
+def response_model_json(schema):
+    # What FastAPI does for a response_model: validate from attributes, then jsonable_encoder and json.dumps.
+    adapter = TypeAdapter(Page[schema])
+    return lambda page: json.dumps(jsonable_encoder(adapter.validate_python(page, from_attributes=True))).encode()
+
+
+async def main():
+    await reset_database()
+    await seed()
+    cases = [
+        ('bid: ORM + response_model', select(Bid), [Bid.created_date, Bid.id], True, response_model_json(BidSchema)),
+        ('bid: columns + orjson', select(*schema_columns(Bid, BidSchema)), [Bid.created_date, Bid.id], True,
+         page_json),
+        ('car: ORM + response_model', select(Car), [Car.id], False, response_model_json(CarSchema)),
+        ('car: columns + orjson', select(*schema_columns(Car, CarSchema)), [Car.id], False, page_json),
+    ]
+    for name, stmt, columns, descending, dump in cases:
+        async def job():
+            async with SessionLocal() as db:
+                dump(await keyset_page(db, stmt, columns, ROWS, None, descending))
+        report(name, await best_of(job), ROWS)
+
+
+if __name__ == '__main__':
+    run(main)
@@ -0,0 +1,46 @@
+"""foreign key and hot path indexes
+
+Revision ID: 2828ee4bfd16
+Revises: dfbdc2083fcd
+Create Date: 2026-10-18 11:20:54.630178
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2828ee4bfd16'
+down_revision: Union[str, None] = 'dfbdc2083fcd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_bid_auction_id_amount', 'bid', ['auction_id', sa.text('amount DESC')]),
+    ('ix_bid_auction_id_created_date', 'bid', ['auction_id', 'created_date', 'id']),
+    ('ix_bid_created_date_id', 'bid', ['created_date', 'id']),
+    ('ix_bid_buyer_id', 'bid', ['buyer_id']),
+    ('ix_car_seller_id', 'car', ['seller_id']),
+    ('ix_feedback_seller_id', 'feedback', ['seller_id']),
+    ('ix_feedback_buyer_id', 'feedback', ['buyer_id']),
+    ('ix_feedback_created_date_id', 'feedback', ['created_date', 'id']),
+    ('ix_refresh_user_id', 'refresh', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps bid placement running while the large tables are indexed.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""bid idempotency key
+
+Revision ID: 3e6f0b8d5a21
+Revises: 9a4d17c3e2b0
+Create Date: 2026-10-18 16:38:52.617204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e6f0b8d5a21'
+down_revision: Union[str, None] = '9a4d17c3e2b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bid', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index('ix_bid_idempotency_key', 'bid', ['buyer_id', 'idempotency_key', 'created_date'],
+                    unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bid_idempotency_key', table_name='bid')
+    op.drop_column('bid', 'idempotency_key')
@@ -0,0 +1,74 @@
+"""car search indexes
+
+Revision ID: 4c1e7a9d3b52
+Revises: 6361b0d7f2c5
+Create Date: 2026-10-18 13:32:47.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7a9d3b52'
+down_revision: Union[str, None] = '6361b0d7f2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_car_price_id', 'car', ['price', 'id']),
+    ('ix_car_mileage_id', 'car', ['mileage', 'id']),
+    ('ix_car_year_id', 'car', ['year', 'id']),
+    ('ix_car_fuel_status_transmission_status_price', 'car', ['fuel_status', 'transmission_status', 'price', 'id']),
+]
+
+# Must stay identical to CAR_SEARCH_VECTOR in models.py for the planner to use the index.
+CAR_SEARCH_VECTOR = ("to_tsvector('simple', coalesce(brand, '') || ' ' || coalesce(model, '') || ' ' "
+                     "|| coalesce(description, ''))")
+
+CAR_FTS_DDL = [
+    "CREATE VIRTUAL TABLE car_fts USING fts5(brand, model, description, content='car', content_rowid='id')",
+    "CREATE TRIGGER car_fts_insert AFTER INSERT ON car BEGIN "
+    "INSERT INTO car_fts(rowid, brand, model, description) VALUES (new.id, new.brand, new.model, new.description); "
+    "END",
+    "CREATE TRIGGER car_fts_delete AFTER DELETE ON car BEGIN "
+    "INSERT INTO car_fts(car_fts, rowid, brand, model, description) "
+    "VALUES ('delete', old.id, old.brand, old.model, old.description); "
+    "END",
+    "CREATE TRIGGER car_fts_update AFTER UPDATE ON car BEGIN "
+    "INSERT INTO car_fts(car_fts, rowid, brand, model, description) "
+    "VALUES ('delete', old.id, old.brand, old.model, old.description); "
+    "INSERT INTO car_fts(rowid, brand, model, description) VALUES (new.id, new.brand, new.model, new.description); "
+    "END",
+    "INSERT INTO car_fts(car_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        if dialect == 'postgresql':
+            op.execute(f'CREATE INDEX CONCURRENTLY ix_car_search ON car USING gin ({CAR_SEARCH_VECTOR})')
+    if dialect == 'sqlite':
+        for statement in CAR_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('car_fts_insert', 'car_fts_delete', 'car_fts_update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS car_fts')
+    with op.get_context().autocommit_block():
+        if dialect == 'postgresql':
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_car_search')
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""hashed refresh tokens
+
+Revision ID: 6361b0d7f2c5
+Revises: 2828ee4bfd16
+Create Date: 2026-10-18 12:41:09.902375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6361b0d7f2c5'
+down_revision: Union[str, None] = '2828ee4bfd16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Raw tokens issued before this revision carry no jti and cannot be rotated; their users log in again.
+    op.execute('DELETE FROM refresh')
+    op.drop_index(op.f('ix_refresh_token'), table_name='refresh')
+    op.drop_column('refresh', 'token')
+    op.add_column('refresh', sa.Column('jti', sa.String(length=32), nullable=False))
+    op.add_column('refresh', sa.Column('token_hash', sa.String(length=64), nullable=False))
+    op.add_column('refresh', sa.Column('expires_at', sa.DateTime(), nullable=False))
+    op.add_column('refresh', sa.Column('rotated_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_refresh_jti'), 'refresh', ['jti'], unique=True)
+    op.create_index(op.f('ix_refresh_expires_at'), 'refresh', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DELETE FROM refresh')
+    op.drop_index(op.f('ix_refresh_expires_at'), table_name='refresh')
+    op.drop_index(op.f('ix_refresh_jti'), table_name='refresh')
+    op.drop_column('refresh', 'rotated_at')
+    op.drop_column('refresh', 'expires_at')
+    op.drop_column('refresh', 'token_hash')
+    op.drop_column('refresh', 'jti')
+    op.add_column('refresh', sa.Column('token', sa.String(), nullable=False))
+    op.create_index(op.f('ix_refresh_token'), 'refresh', ['token'], unique=True)
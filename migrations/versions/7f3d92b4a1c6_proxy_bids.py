@@ -0,0 +1,40 @@
+"""proxy bids
+
+Revision ID: 7f3d92b4a1c6
+Revises: e5a0c9f47d18
+Create Date: 2026-10-18 15:12:40.519732
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3d92b4a1c6'
+down_revision: Union[str, None] = 'e5a0c9f47d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('proxy_bid',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('auction_id', sa.Integer(), nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('max_amount', sa.Integer(), nullable=False),
+    sa.Column('created_date', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['auction_id'], ['auction.id'], ),
+    sa.ForeignKeyConstraint(['buyer_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('auction_id', 'buyer_id', name='uq_proxy_bid_auction_id_buyer_id')
+    )
+    op.create_index(op.f('ix_proxy_bid_buyer_id'), 'proxy_bid', ['buyer_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_proxy_bid_buyer_id'), table_name='proxy_bid')
+    op.drop_table('proxy_bid')
@@ -0,0 +1,28 @@
+"""car image optional
+
+Revision ID: 9a4d17c3e2b0
+Revises: c2b8e61f0a94
+Create Date: 2026-10-18 16:12:41.305719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d17c3e2b0'
+down_revision: Union[str, None] = 'c2b8e61f0a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('car', 'image', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('car', 'image', existing_type=sa.String(), nullable=False)
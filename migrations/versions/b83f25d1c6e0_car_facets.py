@@ -0,0 +1,51 @@
+"""car facets
+
+Revision ID: b83f25d1c6e0
+Revises: 4c1e7a9d3b52
+Create Date: 2026-10-18 14:05:12.638417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83f25d1c6e0'
+down_revision: Union[str, None] = '4c1e7a9d3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('car_facet',
+    sa.Column('facet', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    op.execute("""
+        INSERT INTO car_facet (facet, value, count)
+        SELECT 'fuel_status', CAST(fuel_status AS VARCHAR), count(*) FROM car GROUP BY fuel_status
+        UNION ALL
+        SELECT 'transmission_status', CAST(transmission_status AS VARCHAR), count(*) FROM car
+        GROUP BY transmission_status
+        UNION ALL
+        SELECT 'brand', brand, count(*) FROM car GROUP BY brand
+        UNION ALL
+        SELECT 'price', bucket, count(*) FROM (
+            SELECT CASE WHEN price < 5000 THEN '0-5000'
+                        WHEN price < 10000 THEN '5000-10000'
+                        WHEN price < 20000 THEN '10000-20000'
+                        WHEN price < 50000 THEN '20000-50000'
+                        ELSE '50000+' END AS bucket
+            FROM car
+        ) AS priced GROUP BY bucket
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('car_facet')
@@ -0,0 +1,108 @@
+"""bid partitioning and archive
+
+Revision ID: c2b8e61f0a94
+Revises: 7f3d92b4a1c6
+Create Date: 2026-10-18 15:47:03.882156
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2b8e61f0a94'
+down_revision: Union[str, None] = '7f3d92b4a1c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_bid_auction_id_amount', ['auction_id', sa.text('amount DESC')]),
+    ('ix_bid_auction_id_created_date', ['auction_id', 'created_date', 'id']),
+    ('ix_bid_created_date_id', ['created_date', 'id']),
+    ('ix_bid_buyer_id', ['buyer_id']),
+]
+
+# Monthly partitions from the oldest bid up to three months ahead; the app keeps adding future months.
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc('month', coalesce((SELECT min(created_date) FROM bid_unpartitioned), now()));
+BEGIN
+    WHILE month < date_trunc('month', now()) + interval '4 months' LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF bid FOR VALUES FROM (%L) TO (%L)',
+                       'bid_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                       month, month + interval '1 month');
+        month := month + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bid_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('created_date', sa.DateTime(), nullable=False),
+    sa.Column('auction_id', sa.Integer(), nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('archived_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bid_archive_auction_id'), 'bid_archive', ['auction_id'], unique=False)
+
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    # Bid placement is blocked while the rows are copied; run this in a maintenance window.
+    op.execute('LOCK TABLE bid IN ACCESS EXCLUSIVE MODE')
+    op.rename_table('bid', 'bid_unpartitioned')
+    for name, columns in INDEXES:
+        op.drop_index(name, table_name='bid_unpartitioned')
+    op.execute("""
+        CREATE TABLE bid (
+            id INTEGER NOT NULL DEFAULT nextval('bid_id_seq'),
+            amount INTEGER NOT NULL,
+            created_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            auction_id INTEGER NOT NULL REFERENCES auction (id),
+            buyer_id INTEGER NOT NULL REFERENCES "user" (id),
+            PRIMARY KEY (id, created_date)
+        ) PARTITION BY RANGE (created_date)
+    """)
+    op.execute(CREATE_PARTITIONS)
+    op.execute('CREATE TABLE bid_default PARTITION OF bid DEFAULT')
+    for name, columns in INDEXES:
+        op.create_index(name, 'bid', columns, unique=False)
+    op.execute('INSERT INTO bid (id, amount, created_date, auction_id, buyer_id) '
+               "SELECT id, amount, coalesce(created_date, '1970-01-01'), auction_id, buyer_id FROM bid_unpartitioned")
+    op.execute('ALTER SEQUENCE bid_id_seq OWNED BY bid.id')
+    op.drop_table('bid_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('LOCK TABLE bid IN ACCESS EXCLUSIVE MODE')
+        op.rename_table('bid', 'bid_partitioned')
+        for name, columns in INDEXES:
+            op.drop_index(name, table_name='bid_partitioned')
+        op.execute("""
+            CREATE TABLE bid (
+                id INTEGER NOT NULL DEFAULT nextval('bid_id_seq') PRIMARY KEY,
+                amount INTEGER NOT NULL,
+                created_date TIMESTAMP WITHOUT TIME ZONE,
+                auction_id INTEGER REFERENCES auction (id),
+                buyer_id INTEGER REFERENCES "user" (id)
+            )
+        """)
+        op.execute('INSERT INTO bid (id, amount, created_date, auction_id, buyer_id) '
+                   'SELECT id, amount, created_date, auction_id, buyer_id FROM bid_partitioned')
+        op.execute('ALTER SEQUENCE bid_id_seq OWNED BY bid.id')
+        op.drop_table('bid_partitioned')
+        for name, columns in INDEXES:
+            op.create_index(name, 'bid', columns, unique=False)
+
+    op.drop_index(op.f('ix_bid_archive_auction_id'), table_name='bid_archive')
+    op.drop_table('bid_archive')
@@ -0,0 +1,30 @@
+"""auction closing
+
+Revision ID: dfbdc2083fcd
+Revises: fa93e9e03b64
+Create Date: 2026-10-18 10:03:27.184406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dfbdc2083fcd'
+down_revision: Union[str, None] = 'fa93e9e03b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('auction', sa.Column('winner_bid_id', sa.Integer(), nullable=True))
+    op.create_index('ix_auction_status_end_time', 'auction', ['auction_status', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_auction_status_end_time', table_name='auction')
+    op.drop_column('auction', 'winner_bid_id')
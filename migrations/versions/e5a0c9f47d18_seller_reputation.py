@@ -0,0 +1,37 @@
+"""seller reputation
+
+Revision ID: e5a0c9f47d18
+Revises: b83f25d1c6e0
+Create Date: 2026-10-18 14:38:26.071593
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c9f47d18'
+down_revision: Union[str, None] = 'b83f25d1c6e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COUNTERS = ['feedback_count', 'rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fill it afterwards with: python -m auction_app.services.reputation
+    op.create_table('seller_reputation',
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    *[sa.Column(counter, sa.Integer(), server_default='0', nullable=False) for counter in COUNTERS],
+    sa.ForeignKeyConstraint(['seller_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('seller_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('seller_reputation')
@@ -0,0 +1,46 @@
+"""auction bid state
+
+Revision ID: fa93e9e03b64
+Revises: 8b7cc1d8bd9f
+Create Date: 2026-10-18 09:12:40.511032
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa93e9e03b64'
+down_revision: Union[str, None] = '8b7cc1d8bd9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('auction', sa.Column('current_price', sa.Integer(), nullable=True))
+    op.add_column('auction', sa.Column('current_bid_id', sa.Integer(), nullable=True))
+    op.add_column('auction', sa.Column('current_buyer_id', sa.Integer(), nullable=True))
+    op.add_column('auction', sa.Column('bid_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE auction SET
+            bid_count = (SELECT count(*) FROM bid WHERE bid.auction_id = auction.id),
+            current_price = (SELECT max(amount) FROM bid WHERE bid.auction_id = auction.id)
+    """)
+    op.execute("""
+        UPDATE auction SET
+            current_bid_id = (SELECT bid.id FROM bid WHERE bid.auction_id = auction.id
+                              ORDER BY bid.amount DESC, bid.id LIMIT 1),
+            current_buyer_id = (SELECT bid.buyer_id FROM bid WHERE bid.auction_id = auction.id
+                                ORDER BY bid.amount DESC, bid.id LIMIT 1)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('auction', 'bid_count')
+    op.drop_column('auction', 'current_buyer_id')
+    op.drop_column('auction', 'current_bid_id')
+    op.drop_column('auction', 'current_price')
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['DB_URL'] = os.getenv('TEST_DB_URL', f'sqlite+aiosqlite:///{DB_PATH}')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('SECRET_KEY', 'test')
+os.environ['MEDIA_ROOT'] = os.path.join(os.path.dirname(DB_PATH), 'media')
+
+import fakeredis
+import httpx
+import pytest
+from sqlalchemy import event
+from auction_app.db import redis_client
+from auction_app.db.database import engine, Base, SessionLocal
+from auction_app.db.models import (UserProfile, Car, Auction, StatusChoices, StatusFuelChoices,
+                                   StatusTransmissionsChoices, StatusAuctionChoices)
+from auction_app.main import auction_app
+from auction_app.services.rate_limit import memory_backend
+from auction_app.services.response_cache import response_cache
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+async def db():
+    # The SQLite full-text table is outside the metadata, so a fresh file is simpler than drop_all.
+    if engine.url.get_backend_name() == 'sqlite' and os.path.exists(engine.url.database):
+        os.remove(engine.url.database)
+    async with engine.begin() as conn:
+        if engine.url.get_backend_name() != 'sqlite':
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as session:
+        yield session
+    await engine.dispose()
+    response_cache.entries.clear()
+    response_cache.generations.clear()
+    memory_backend.buckets.clear()
+
+
+@contextmanager
+def query_budget(limit: int):
+    """Fail when the block runs more than ``limit`` SQL statements."""
+    statements = []
+
+    def count(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count)
+    assert len(statements) <= limit, f'{len(statements)} queries, budget is {limit}:\n' + '\n'.join(statements)
+
+
+async def create_users(db, count: int, status=StatusChoices.buyer, prefix='buyer'):
+    users = [UserProfile(status=status, username=f'{prefix}{i}', hash_password='-') for i in range(count)]
+    db.add_all(users)
+    await db.commit()
+    return users
+
+
+async def create_auction(db, seller: UserProfile, brand='car', end_time=None, **values):
+    car = Car(brand=brand, model='m', year=datetime(2020, 1, 1), fuel_status=StatusFuelChoices.gas,
+              transmission_status=StatusTransmissionsChoices.automatic, mileage=1000, price=100,
+              description='-', seller_id=seller.id)
+    db.add(car)
+    await db.flush()
+    now = datetime.utcnow()
+    auction = Auction(start_price=values.pop('start_price', 10), start_time=now - timedelta(hours=1),
+                      end_time=end_time or now + timedelta(hours=1), auction_status=StatusAuctionChoices.active,
+                      car_id=car.id, **values)
+    db.add(auction)
+    await db.commit()
+    return auction
+
+
+@pytest.fixture
+async def seller(db):
+    return (await create_users(db, 1, StatusChoices.seller, 'seller'))[0]
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redis_client.redis_client = client
+    yield client
+    redis_client.redis_client = None
+    await client.aclose()
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=auction_app), base_url='http://test') as client:
+        yield client
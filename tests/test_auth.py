@@ -0,0 +1,31 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def login(client):
+    await client.post('/auth/register/', json={'status': 'buyer', 'username': 'buyer', 'hash_password': 'secret',
+                                               'phone_number': None})
+    response = await client.post('/auth/login/', data={'username': 'buyer', 'password': 'secret'})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_rotated_refresh_token_cannot_log_out(client):
+    tokens = await login(client)
+    rotated = await client.post('/auth/refresh/', params={'refresh_token': tokens['refresh_token']})
+    assert rotated.status_code == 200
+
+    response = await client.post('/auth/logout/', params={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 401
+
+    response = await client.post('/auth/logout/', params={'refresh_token': rotated.json()['refresh_token']})
+    assert response.status_code == 200
+
+
+async def test_logged_out_refresh_token_cannot_refresh(client):
+    tokens = await login(client)
+    assert (await client.post('/auth/logout/', params={'refresh_token': tokens['refresh_token']})).status_code == 200
+
+    response = await client.post('/auth/refresh/', params={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 401
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from datetime import datetime
+from sqlalchemy import select, update
+from auction_app.db.database import SessionLocal
+from auction_app.db.models import Auction, Bid, StatusAuctionChoices
+from auction_app.services.bid_engine import place_bid, write_bids, BidError, BidTooLow, AuctionClosed
+from tests.conftest import create_users, create_auction
+
+pytestmark = pytest.mark.anyio
+
+
+async def bid(auction_id: int, buyer_id: int, amount: int):
+    async with SessionLocal() as db:
+        try:
+            return await place_bid(db, auction_id, buyer_id, amount)
+        except BidError as error:
+            return error
+
+
+async def test_concurrent_bids_have_one_monotonic_winner(db, seller):
+    buyers = await create_users(db, 8)
+    auction = await create_auction(db, seller)
+    # Every price level is contested by several buyers at once.
+    attempts = [(buyers[(price + i) % len(buyers)].id, price) for price in range(10, 260) for i in range(4)]
+
+    results = await asyncio.gather(*[bid(auction.id, buyer_id, amount) for buyer_id, amount in attempts])
+
+    placed = [result for result in results if isinstance(result, Bid)]
+    assert all(isinstance(result, (Bid, BidTooLow)) for result in results)
+    rows = (await db.scalars(select(Bid).where(Bid.auction_id == auction.id).order_by(Bid.id))).all()
+    amounts = [row.amount for row in rows]
+    assert len(rows) == len(placed)
+    assert amounts == sorted(set(amounts))
+
+    await db.refresh(auction)
+    assert auction.bid_count == len(rows)
+    assert auction.current_price == rows[-1].amount
+    assert auction.current_bid_id == rows[-1].id
+    assert auction.current_buyer_id == rows[-1].buyer_id
+
+
+async def test_bid_below_minimum_is_rejected(db, seller):
+    buyer, = await create_users(db, 1)
+    auction = await create_auction(db, seller, start_price=50)
+
+    with pytest.raises(BidTooLow):
+        await place_bid(db, auction.id, buyer.id, 49)
+    await place_bid(db, auction.id, buyer.id, 50)
+    with pytest.raises(BidTooLow):
+        await place_bid(db, auction.id, buyer.id, 50)
+
+
+async def test_bid_on_closed_auction_is_rejected(db, seller):
+    buyer, = await create_users(db, 1)
+    auction = await create_auction(db, seller)
+    auction.end_time = auction.start_time
+    await db.commit()
+
+    with pytest.raises(BidError) as error:
+        await place_bid(db, auction.id, buyer.id, 100)
+    assert error.value.status_code == 409
+    assert (await db.get(Auction, auction.id)).bid_count == 0
+
+
+async def test_guarded_update_rejects_bid_after_close(db, seller):
+    buyer, = await create_users(db, 1)
+    auction = await create_auction(db, seller)
+    # Another worker closes the auction after this one has read it, as can happen without FOR UPDATE.
+    async with SessionLocal() as other:
+        await other.execute(update(Auction).where(Auction.id == auction.id)
+                            .values(auction_status=StatusAuctionChoices.completed))
+        await other.commit()
+
+    with pytest.raises(AuctionClosed):
+        await write_bids(db, auction, [(buyer.id, 20)], datetime.utcnow())
+    assert (await db.scalars(select(Bid).where(Bid.auction_id == auction.id))).all() == []
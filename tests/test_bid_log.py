@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from sqlalchemy import event, select
+from auction_app.config import BID_DEAD_LETTER_KEY
+from auction_app.api.endpoints import bid as bid_endpoint
+from auction_app.db import redis_client
+from auction_app.db.database import engine
+from auction_app.db.models import Auction, Bid, StatusAuctionChoices, UserProfile
+from auction_app.services import auction_closer, bid_engine, bid_log
+from auction_app.services.auction_closer import AuctionCloser, close_auctions
+from auction_app.services.bid_engine import accept_bid, set_proxy_bid, BidTooLow, BidLogUnavailable
+from auction_app.services.live_cache import live_key, get_live_auction
+from tests.conftest import create_auction, create_users
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=['redis', 'file'])
+async def log(request, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(auction_closer, 'BID_WRITE_BEHIND', True)
+    monkeypatch.setattr(bid_engine, 'BID_WRITE_BEHIND', True)
+    if request.param == 'redis':
+        monkeypatch.setattr(redis_client, 'redis_client', fakeredis.FakeAsyncRedis(decode_responses=True))
+    else:
+        monkeypatch.setattr(bid_log, 'file_log', bid_log.FileBidLog(str(tmp_path / 'bids.jsonl')))
+    return bid_log.get_bid_log()
+
+
+async def dead_letters(log):
+    if isinstance(log, bid_log.RedisBidLog):
+        return [fields for _, fields in await log.redis.xrange(BID_DEAD_LETTER_KEY)]
+    with open(log.dead_path, encoding='utf-8') as file:
+        return file.readlines()
+
+
+async def test_closer_waits_for_logged_bids(db, seller, log):
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    assert await log.pending_auctions() == {auction.id}
+
+    after_end = datetime.utcnow() + timedelta(hours=2)
+    await AuctionCloser().close([auction.id], after_end)
+    assert (await db.get(Auction, auction.id, populate_existing=True)).auction_status == StatusAuctionChoices.active
+
+    await bid_log.flush_bids()
+    assert await log.pending_auctions() == set()
+    await AuctionCloser().close([auction.id], after_end)
+    auction = await db.get(Auction, auction.id, populate_existing=True)
+    bid = await db.scalar(select(Bid).where(Bid.auction_id == auction.id))
+    assert auction.auction_status == StatusAuctionChoices.completed
+    assert auction.winner_bid_id == bid.id and bid.amount == 50
+
+
+async def test_flush_dead_letters_bids_for_closed_auctions(db, seller, log):
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    # A closer that ignores the log finalises the auction before the bid is flushed.
+    await close_auctions(db, datetime.utcnow() + timedelta(hours=2), 10)
+
+    await bid_log.flush_bids()
+    auction = await db.get(Auction, auction.id, populate_existing=True)
+    assert await db.scalar(select(Bid.id).where(Bid.auction_id == auction.id)) is None
+    assert auction.current_price is None and auction.bid_count == 0
+    assert len(await dead_letters(log)) == 1
+    assert await log.pending_auctions() == set()
+
+
+async def test_accepted_bid_refreshes_live_state_ttl(db, seller, redis):
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    await redis.expire(live_key(auction.id), 5)
+
+    await accept_bid(auction.id, buyer.id, 60, 'k2')
+    assert await redis.ttl(live_key(auction.id)) > 5
+
+
+async def test_idempotency_keys_are_scoped_to_the_buyer(db, seller, log):
+    first, second = await create_users(db, 2)
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, first.id, 50, 'same')
+    await accept_bid(auction.id, second.id, 60, 'same')
+    await accept_bid(auction.id, second.id, 60, 'same')
+
+    await bid_log.flush_bids()
+    bids = (await db.scalars(select(Bid.buyer_id).where(Bid.auction_id == auction.id).order_by(Bid.id))).all()
+    assert bids == [first.id, second.id]
+    assert (await db.get(Auction, auction.id, populate_existing=True)).current_buyer_id == second.id
+
+
+async def test_sync_retry_honours_idempotency_key(db, seller, log):
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+    await log.pin(auction.id)
+
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    assert (await db.scalars(select(Bid.id).where(Bid.auction_id == auction.id))).all() == [1]
+
+
+async def test_unreachable_log_refuses_direct_writes(db, seller, monkeypatch):
+    # Bids the log acknowledged cannot be checked for, so writing past them is refused rather than guessed.
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(redis_client, 'redis_client', fakeredis.FakeAsyncRedis(server=server))
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+
+    with pytest.raises(BidLogUnavailable):
+        await accept_bid(auction.id, buyer.id, 50, 'k1')
+    assert await db.scalar(select(Bid.id)) is None
+
+
+async def test_sync_writes_wait_for_logged_bids(db, seller, log):
+    first, second = [user.id for user in await create_users(db, 2)]
+    auction_id = (await create_auction(db, seller)).id
+    await accept_bid(auction_id, first, 100, 'k1')
+
+    with pytest.raises(BidTooLow):
+        await set_proxy_bid(db, auction_id, second, 80)
+    await db.rollback()
+    _, bids = await set_proxy_bid(db, auction_id, second, 150)
+
+    assert [bid.amount for bid in bids] == [101]
+    auction = await db.get(Auction, auction_id, populate_existing=True)
+    assert (auction.current_price, auction.current_buyer_id, auction.bid_count) == (101, second, 2)
+    if isinstance(log, bid_log.RedisBidLog):
+        live = await get_live_auction(log.redis, auction_id)
+        assert (live['current_price'], live['current_buyer_id']) == (101, second)
+
+
+async def test_flush_repairs_live_state(db, seller, log):
+    buyer = (await create_users(db, 1))[0]
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, buyer.id, 50, 'k1')
+    if not isinstance(log, bid_log.RedisBidLog):
+        return
+
+    await log.redis.hset(live_key(auction.id), mapping={'current_price': '10', 'current_buyer_id': str(seller.id)})
+    await bid_log.flush_bids()
+    live = await get_live_auction(log.redis, auction.id)
+    assert (live['current_price'], live['current_buyer_id'], live['bid_count']) == (50, buyer.id, 1)
+
+
+async def test_concurrent_first_bids_do_not_reprime_over_each_other(db, seller, tmp_path, monkeypatch):
+    log = bid_log.FileBidLog(str(tmp_path / 'bids.jsonl'))
+    monkeypatch.setattr(bid_log, 'file_log', log)
+    first, second = await create_users(db, 2)
+    auction = await create_auction(db, seller)
+    now = datetime.utcnow()
+
+    # Both bids missed and loaded the same row; the first is accepted before the second primes.
+    await log.prime(auction, False)
+    assert (await log.accept(auction.id, first.id, 100, 'k1', now))[0] == 'ok'
+    await log.prime(auction, False)
+    assert await log.accept(auction.id, second.id, 50, 'k2', now) == ('low', 101, None)
+
+
+async def test_restart_recovers_unflushed_bids(db, seller, tmp_path, monkeypatch):
+    path = str(tmp_path / 'bids.jsonl')
+    monkeypatch.setattr(bid_log, 'file_log', bid_log.FileBidLog(path))
+    monkeypatch.setattr(auction_closer, 'BID_WRITE_BEHIND', True)
+    first, second = await create_users(db, 2)
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, first.id, 100, 'k1')
+
+    restarted = bid_log.FileBidLog(path)
+    monkeypatch.setattr(bid_log, 'file_log', restarted)
+    await restarted.recover()
+    assert await restarted.pending_auctions() == {auction.id}
+    with pytest.raises(BidTooLow):
+        await accept_bid(auction.id, second.id, 50, 'k2')
+    assert (await accept_bid(auction.id, first.id, 100, 'k1'))['bid_count'] == '1'
+
+    await bid_log.flush_bids()
+    auction = await db.get(Auction, auction.id, populate_existing=True)
+    assert (auction.current_price, auction.current_buyer_id, auction.bid_count) == (100, first.id, 1)
+
+
+async def test_logged_bid_does_not_check_out_a_connection(client, db, seller, log, monkeypatch):
+    monkeypatch.setattr(bid_endpoint, 'BID_WRITE_BEHIND', True)
+    await client.post('/auth/register/', json={'status': 'buyer', 'username': 'buyer', 'hash_password': 'secret',
+                                               'phone_number': None})
+    token = (await client.post('/auth/login/', data={'username': 'buyer', 'password': 'secret'})).json()
+    headers = {'Authorization': f"Bearer {token['access_token']}"}
+    buyer_id = await db.scalar(select(UserProfile.id).where(UserProfile.username == 'buyer'))
+    auction = await create_auction(db, seller)
+    await accept_bid(auction.id, seller.id, 20, 'prime')
+
+    checkouts = []
+
+    def listener(*args):
+        checkouts.append(args)
+
+    event.listen(engine.sync_engine.pool, 'checkout', listener)
+    try:
+        response = await client.post('/bid/', json={'auction_id': auction.id, 'buyer_id': buyer_id, 'amount': 50},
+                                     headers=headers)
+    finally:
+        event.remove(engine.sync_engine.pool, 'checkout', listener)
+    assert response.status_code == 202
+    assert checkouts == []
@@ -0,0 +1,77 @@
+import io
+import os
+import shutil
+
+import pytest
+from PIL import Image
+from sqlalchemy import select
+from auction_app.api.endpoints import car
+from auction_app.config import MEDIA_ROOT
+from auction_app.db.models import UserProfile
+from tests.conftest import create_auction
+
+pytestmark = pytest.mark.anyio
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG')
+    return {'file': ('car.png', buffer.getvalue(), 'image/png')}
+
+
+def stored_files():
+    return [name for _, _, names in os.walk(MEDIA_ROOT) for name in names]
+
+
+async def login(client, username, status):
+    await client.post('/auth/register/', json={'status': status, 'username': username, 'hash_password': 'secret',
+                                               'phone_number': None})
+    response = await client.post('/auth/login/', data={'username': username, 'password': 'secret'})
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def seller_headers(client, db):
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    headers = await login(client, 'seller', 'seller')
+    await create_auction(db, await db.scalar(select(UserProfile).where(UserProfile.username == 'seller')))
+    return headers
+
+
+async def test_only_the_seller_can_upload(client, seller_headers):
+    assert (await client.post('/car/1/image/', files=png())).status_code == 401
+    buyer_headers = await login(client, 'buyer', 'buyer')
+    assert (await client.post('/car/1/image/', files=png(), headers=buyer_headers)).status_code == 403
+    assert (await client.post('/car/2/image/', files=png(), headers=seller_headers)).status_code == 404
+    assert stored_files() == []
+
+    response = await client.post('/car/1/image/', files=png(), headers=seller_headers)
+    assert response.status_code == 200
+    assert (await client.get('/car/1/')).json()['image'] == response.json()['image']
+
+
+async def test_failed_update_removes_the_stored_file(client, seller_headers, monkeypatch):
+    owned_car = car.owned_car
+    calls = []
+
+    async def deleted_during_upload(*args, **options):
+        calls.append(options)
+        if len(calls) > 1:
+            raise car.HTTPException(status_code=404, detail='такого авто не существует')
+        return await owned_car(*args, **options)
+
+    monkeypatch.setattr(car, 'owned_car', deleted_during_upload)
+    assert (await client.post('/car/1/image/', files=png(), headers=seller_headers)).status_code == 404
+    assert stored_files() == []
+
+
+async def test_only_the_upload_sets_the_image(client, seller_headers):
+    image = (await client.post('/car/1/image/', files=png(), headers=seller_headers)).json()['image']
+    car = (await client.get('/car/1/')).json()
+
+    response = await client.put('/car/1', json={**car, 'image': None, 'price': 555})
+    assert response.status_code == 200
+    assert response.json()['image'] == image
+
+    response = await client.post('/car/', json={**car, 'brand': 'other', 'image': '/etc/passwd'})
+    assert response.json()['image'] is None
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from auction_app.config import SOFT_CLOSE_WINDOW_SECONDS, SOFT_CLOSE_EXTENSION_SECONDS
+from auction_app.db.models import Auction
+from auction_app.services.auction_closer import AuctionCloser
+from auction_app.services.auction_events import hub
+from auction_app.services.bid_engine import place_bid
+from auction_app.services.deadlines import DeadlineHeap
+from tests.conftest import create_users, create_auction
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def closer(monkeypatch):
+    closer = AuctionCloser()
+    # Without Redis, bid events are dispatched straight to the local listeners.
+    monkeypatch.setattr(hub, 'listeners', [closer.on_event])
+    return closer
+
+
+async def test_bid_inside_soft_close_window_extends_and_reschedules(db, seller, closer):
+    buyer, = await create_users(db, 1)
+    end_time = datetime.utcnow() + timedelta(seconds=SOFT_CLOSE_WINDOW_SECONDS / 2)
+    auction = await create_auction(db, seller, end_time=end_time)
+    closer.schedule(auction.id, end_time)
+
+    bid = await place_bid(db, auction.id, buyer.id, 20)
+
+    extended = (await db.get(Auction, auction.id, populate_existing=True)).end_time
+    assert extended == bid.created_date + timedelta(seconds=SOFT_CLOSE_EXTENSION_SECONDS)
+    assert extended > end_time
+    assert closer.deadlines.deadlines[auction.id] == extended
+    assert closer.deadlines.pop_due(end_time) == []
+
+
+async def test_bid_outside_soft_close_window_keeps_end_time(db, seller, closer):
+    buyer, = await create_users(db, 1)
+    end_time = datetime.utcnow() + timedelta(seconds=SOFT_CLOSE_WINDOW_SECONDS * 10)
+    auction = await create_auction(db, seller, end_time=end_time)
+    closer.schedule(auction.id, end_time)
+
+    await place_bid(db, auction.id, buyer.id, 20)
+
+    assert (await db.get(Auction, auction.id, populate_existing=True)).end_time == end_time
+    assert closer.deadlines.deadlines[auction.id] == end_time
+
+
+def test_rescheduled_deadline_skips_stale_entry():
+    heap = DeadlineHeap()
+    assert heap.schedule(1, T0)
+    assert not heap.schedule(1, T0)
+    assert not heap.schedule(1, T0 + timedelta(minutes=1))
+
+    assert heap.next_deadline() == T0 + timedelta(minutes=1)
+    assert heap.pop_due(T0) == []
+    assert heap.pop_due(T0 + timedelta(minutes=1)) == [1]
+    assert len(heap) == 0 and heap.next_deadline() is None
+
+
+def test_cancelled_deadline_is_never_due():
+    heap = DeadlineHeap()
+    heap.schedule(1, T0)
+    heap.schedule(2, T0 + timedelta(seconds=1))
+    heap.cancel(1)
+
+    assert heap.next_deadline() == T0 + timedelta(seconds=1)
+    assert heap.pop_due(T0 + timedelta(minutes=1)) == [2]
+
+
+def test_earlier_deadline_wakes_the_closer():
+    heap = DeadlineHeap()
+    assert heap.schedule(1, T0 + timedelta(minutes=1))
+    assert heap.schedule(2, T0)
+    assert not heap.schedule(3, T0 + timedelta(minutes=2))
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import update
+from auction_app.db.models import Auction, StatusAuctionChoices
+from auction_app.services.bid_engine import place_bid
+from auction_app.services.live_cache import cache_auction, get_live_auction, live_key
+from tests.conftest import create_users, create_auction
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cache_round_trip(db, redis, seller):
+    auction = await create_auction(db, seller, current_price=40, current_buyer_id=seller.id, bid_count=3)
+
+    await cache_auction(redis, auction)
+    live = await get_live_auction(redis, auction.id)
+
+    assert live['current_price'] == 40
+    assert live['current_buyer_id'] == seller.id
+    assert live['bid_count'] == 3
+    assert live['end_time'] == auction.end_time
+    assert live['auction_status'] == StatusAuctionChoices.active
+
+
+async def test_older_state_does_not_overwrite_newer(db, redis, seller):
+    auction = await create_auction(db, seller, current_price=40, bid_count=3)
+    await cache_auction(redis, auction)
+
+    auction.current_price, auction.bid_count = 20, 2
+    await cache_auction(redis, auction)
+
+    assert (await get_live_auction(redis, auction.id))['current_price'] == 40
+
+
+async def test_equal_state_only_replaced_from_flushed_row(db, redis, seller):
+    auction = await create_auction(db, seller, current_price=40, bid_count=3)
+    await cache_auction(redis, auction)
+
+    auction.current_price = 20
+    await cache_auction(redis, auction)
+    assert (await get_live_auction(redis, auction.id))['current_price'] == 40
+
+    await cache_auction(redis, auction, replace_equal=True)
+    assert (await get_live_auction(redis, auction.id))['current_price'] == 20
+
+
+async def test_status_change_invalidates(db, redis, seller):
+    auction = await create_auction(db, seller)
+    await cache_auction(redis, auction)
+
+    auction.auction_status = StatusAuctionChoices.canceled
+    await cache_auction(redis, auction)
+
+    assert not await redis.exists(live_key(auction.id))
+    assert await get_live_auction(redis, auction.id) is None
+
+
+async def test_bid_writes_through(db, redis, seller):
+    buyer, = await create_users(db, 1)
+    auction = await create_auction(db, seller)
+
+    await place_bid(db, auction.id, buyer.id, 25)
+    live = await get_live_auction(redis, auction.id)
+
+    assert (live['current_price'], live['current_buyer_id'], live['bid_count']) == (25, buyer.id, 1)
+
+
+async def test_detail_is_served_from_cache(client, db, redis, seller):
+    auction = await create_auction(db, seller, current_price=40, bid_count=1)
+    assert (await client.get(f'/auction/{auction.id}/')).json()['current_price'] == 40
+
+    # A database change that skipped the cache stays invisible until the cache entry goes away.
+    await db.execute(update(Auction).where(Auction.id == auction.id).values(current_price=99))
+    await db.commit()
+    assert (await client.get(f'/auction/{auction.id}/')).json()['current_price'] == 40
+
+    await redis.delete(live_key(auction.id))
+    assert (await client.get(f'/auction/{auction.id}/')).json()['current_price'] == 99
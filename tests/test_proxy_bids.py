@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import select
+from auction_app.db.database import SessionLocal
+from auction_app.db.models import Auction, Bid
+from auction_app.services import bid_engine
+from auction_app.services.bid_engine import place_bid, set_proxy_bid, BidTooLow
+from tests.conftest import create_users, create_auction
+
+pytestmark = pytest.mark.anyio
+
+
+async def proxy(auction_id: int, buyer_id: int, max_amount: int):
+    async with SessionLocal() as db:
+        return await set_proxy_bid(db, auction_id, buyer_id, max_amount)
+
+
+async def manual(auction_id: int, buyer_id: int, amount: int):
+    async with SessionLocal() as db:
+        return await place_bid(db, auction_id, buyer_id, amount)
+
+
+async def standing(auction_id: int):
+    async with SessionLocal() as db:
+        auction = await db.get(Auction, auction_id)
+        bids = (await db.execute(select(Bid.buyer_id, Bid.amount).where(Bid.auction_id == auction_id)
+                                 .order_by(Bid.id))).all()
+    return auction.current_price, auction.current_buyer_id, [tuple(bid) for bid in bids]
+
+
+@pytest.fixture
+async def bidders(db, seller):
+    a, b = [user.id for user in await create_users(db, 2)]
+    auction = await create_auction(db, seller, start_price=10)
+    return auction.id, a, b
+
+
+async def test_proxy_war_settles_one_increment_above_the_loser(bidders):
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+    await proxy(auction_id, b, 60)
+
+    assert await standing(auction_id) == (61, a, [(a, 10), (b, 60), (a, 61)])
+
+
+async def test_proxy_war_is_capped_at_the_winners_max(bidders, monkeypatch):
+    monkeypatch.setattr(bid_engine, 'BID_MIN_INCREMENT', 5)
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+    await proxy(auction_id, b, 98)
+
+    price, leader, bids = await standing(auction_id)
+    assert (price, leader) == (100, a)
+    assert bids[-2:] == [(b, 98), (a, 100)]
+
+
+async def test_manual_bid_against_standing_proxy(bidders):
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+
+    bid = await manual(auction_id, b, 50)
+    assert (bid.buyer_id, bid.amount) == (b, 50)
+    assert await standing(auction_id) == (51, a, [(a, 10), (b, 50), (a, 51)])
+
+    await manual(auction_id, b, 150)
+    assert (await standing(auction_id))[:2] == (150, b)
+
+
+async def test_leader_raising_own_max_keeps_the_price(bidders):
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+    await proxy(auction_id, b, 60)
+
+    _, bids = await proxy(auction_id, a, 200)
+    assert bids == []
+    assert (await standing(auction_id))[:2] == (61, a)
+
+
+async def test_equal_maxima_go_to_the_earlier_proxy(bidders):
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+    await proxy(auction_id, b, 100)
+
+    assert await standing(auction_id) == (100, a, [(a, 10), (a, 100)])
+
+
+async def test_proxy_below_minimum_next_bid_is_rejected(bidders):
+    auction_id, a, b = bidders
+    await proxy(auction_id, a, 100)
+    await proxy(auction_id, b, 60)
+
+    with pytest.raises(BidTooLow):
+        await proxy(auction_id, b, 61)
+    with pytest.raises(BidTooLow):
+        await proxy(auction_id, a, 60)
+    assert (await standing(auction_id))[:2] == (61, a)
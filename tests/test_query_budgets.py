@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+from auction_app.db.models import Bid, Feedback, ProxyBid, RefreshToken
+from tests.conftest import create_auction, create_users, query_budget
+
+pytestmark = pytest.mark.anyio
+
+# Several rows of every kind, so an N+1 shows up as a blown budget rather than one extra query.
+ROWS = 5
+
+
+async def seed(db, seller):
+    buyers = await create_users(db, ROWS)
+    for i in range(ROWS):
+        auction = await create_auction(db, seller, brand=f'car{i}')
+        db.add_all([Bid(auction_id=auction.id, buyer_id=buyer.id, amount=20 + j, created_date=datetime.utcnow())
+                    for j, buyer in enumerate(buyers)])
+        db.add_all([ProxyBid(auction_id=auction.id, buyer_id=buyer.id, max_amount=100) for buyer in buyers])
+    db.add_all([Feedback(seller_id=seller.id, buyer_id=buyer.id, rating=5) for buyer in buyers])
+    db.add_all([RefreshToken(jti=f'jti{i}', token_hash='-', expires_at=datetime.utcnow(), user_id=buyer.id)
+                for i, buyer in enumerate(buyers)])
+    await db.commit()
+    return buyers
+
+
+@pytest.mark.parametrize('path, budget', [('/car/', 1), ('/car/search/', 1), ('/bid/', 1), ('/auction/', 1),
+                                          ('/user/', 1), ('/feedback/', 1), ('/auction/1/full/', 2)])
+async def test_read_budget(client, db, seller, path, budget):
+    await seed(db, seller)
+    with query_budget(budget):
+        assert (await client.get(path)).status_code == 200
+
+
+async def test_user_delete_budget(client, db, seller):
+    buyers = await seed(db, seller)
+    with query_budget(20):
+        assert (await client.delete(f'/user/{seller.id}/')).status_code == 200
+    with query_budget(12):
+        assert (await client.delete(f'/user/{buyers[0].id}/')).status_code == 200
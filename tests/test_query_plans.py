@@ -0,0 +1,54 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from auction_app.db.models import Auction, Bid, StatusAuctionChoices
+from auction_app.db.pagination import apply_keyset, schema_columns
+from auction_app.db.schema import AuctionSchema, BidSchema
+from auction_app.db.database import engine
+from auction_app.config import AUCTION_TOP_BIDS, PAGE_DEFAULT_LIMIT
+
+pytestmark = pytest.mark.anyio
+
+
+async def query_plan(db, stmt) -> str:
+    conn = await db.connection()
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    if engine.url.get_backend_name() == 'sqlite':
+        result = await conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)
+        return '\n'.join(row[-1] for row in result)
+    result = await conn.exec_driver_sql('EXPLAIN ' + str(compiled), params)
+    return '\n'.join(row[0] for row in result)
+
+
+async def test_bid_history_uses_auction_created_date_index(db):
+    query = select(*schema_columns(Bid, BidSchema)).where(Bid.auction_id == 1)
+    plan = await query_plan(db, apply_keyset(query, [Bid.created_date, Bid.id], PAGE_DEFAULT_LIMIT, descending=True))
+
+    assert 'ix_bid_auction_id_created_date' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+async def test_top_bids_use_auction_amount_index(db):
+    query = (select(Bid).where(Bid.auction_id == 1)
+             .order_by(Bid.amount.desc(), Bid.id).limit(AUCTION_TOP_BIDS))
+    plan = await query_plan(db, query)
+
+    assert 'ix_bid_auction_id_amount' in plan
+
+
+async def test_due_auctions_use_status_end_time_index(db):
+    query = (select(Auction.id)
+             .where(Auction.auction_status == StatusAuctionChoices.active, Auction.end_time <= datetime.utcnow())
+             .order_by(Auction.end_time).limit(500))
+    plan = await query_plan(db, query)
+
+    assert 'ix_auction_status_end_time' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+async def test_auction_list_walks_primary_key(db):
+    query = select(*schema_columns(Auction, AuctionSchema))
+    plan = await query_plan(db, apply_keyset(query, [Auction.id], PAGE_DEFAULT_LIMIT, cursor=None))
+
+    assert 'TEMP B-TREE' not in plan
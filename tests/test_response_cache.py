@@ -0,0 +1,43 @@
+import pytest
+from auction_app.services.response_cache import ResponseCache, namespace_key
+from tests.conftest import create_auction
+
+pytestmark = pytest.mark.anyio
+
+
+def worker():
+    return ResponseCache(maxsize=100, local_ttl=60, ttl=300)
+
+
+async def test_shared_tier_serves_other_workers(redis):
+    a, b = worker(), worker()
+    entry, shared_generation = await a.get(redis, 'car', '/car/1/')
+    assert entry is None
+    await a.set(redis, 'car', '/car/1/', '"e1"', b'{}', 0, shared_generation)
+
+    assert (await b.get(redis, 'car', '/car/1/'))[0] == ('"e1"', b'{}')
+
+
+async def test_invalidation_during_load_keeps_stale_body_out(redis):
+    a, b = worker(), worker()
+    _, shared_generation = await a.get(redis, 'car', '/car/1/')
+    # Worker B changes the data and invalidates while A is still loading the old version.
+    await b.invalidate(redis, 'car')
+    await a.set(redis, 'car', '/car/1/', '"old"', b'{}', 0, shared_generation)
+
+    assert not await redis.hexists(namespace_key('car'), '/car/1/')
+    assert (await b.get(redis, 'car', '/car/1/'))[0] is None
+
+
+async def test_conditional_get(client, db, redis, seller):
+    await create_auction(db, seller)
+    first = await client.get('/car/1/')
+    assert first.status_code == 200
+
+    second = await client.get('/car/1/', headers={'If-None-Match': first.headers['etag']})
+    assert second.status_code == 304
+
+    await client.put('/car/1', json={**first.json(), 'price': 555})
+    third = await client.get('/car/1/', headers={'If-None-Match': first.headers['etag']})
+    assert third.status_code == 200
+    assert third.json()['price'] == 555